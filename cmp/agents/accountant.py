@@ -187,14 +187,13 @@ class AIAccountant:
         from ..integrations.invoices import wio_bank, zoho_books
         
         try:
-            # Get bank transactions from Wio Bank
-            bank_transactions = await wio_bank.fetch_transactions(days=1)
-            
-            # Get transactions from Zoho Books
-            zoho_transactions = await zoho_books.get_transactions(account_id)
-            
-            # Get current balance from Wio Bank
-            balance_info = await wio_bank.get_balance()
+            # Bank transactions, Zoho Books transactions and bank balance are
+            # independent, so fetch them concurrently over the pooled clients
+            bank_transactions, zoho_transactions, balance_info = await asyncio.gather(
+                wio_bank.fetch_transactions(days=1),
+                zoho_books.get_transactions(account_id),
+                wio_bank.get_balance()
+            )
             
             # Perform reconciliation logic
             bank_total = sum(txn.get("amount", 0) for txn in bank_transactions)
@@ -11,6 +11,8 @@ Responsibilities:
 """
 
 import asyncio
+import time
+from types import MappingProxyType
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
 import statistics
@@ -20,6 +22,18 @@ from ..utils.ai import transaction_categorizer, insight_engine
 
 logger = get_logger("agents.director")
 
+# Formatted "now" reused for up to a second across dashboard polls
+_ts_cache = {"t": 0.0, "s": ""}
+
+
+def _now_iso() -> str:
+    """Return the current time as ISO string, refreshed at most once per second"""
+    now = time.monotonic()
+    if now - _ts_cache["t"] >= 1.0 or not _ts_cache["s"]:
+        _ts_cache["s"] = datetime.now().isoformat()
+        _ts_cache["t"] = now
+    return _ts_cache["s"]
+
 
 class AIDirector:
     """AI Financial Director - strategic financial management with advanced AI capabilities"""
@@ -37,6 +51,30 @@ class AIDirector:
             "current_ratio": 2.0,
             "debt_to_equity": 0.30
         }
+        # Static part of the status, built once; get_status copies the nested
+        # values so callers can't change what later callers (or limits) see
+        self._status_template = MappingProxyType({
+            "name": self.name,
+            "agent": self.name,
+            "status": "active",
+            "last_activity": "AI-powered strategic financial management and oversight active",
+            "capabilities": (
+                "AI-enhanced controller oversight with strategic analysis",
+                "Predictive cash flow forecasting with ML models",
+                "AI-powered P&L analysis with trend insights",
+                "Intelligent balance sheet analysis and health scoring",
+                "Smart payment authorization with risk assessment",
+                "Executive dashboard with AI business intelligence",
+                "Strategic planning and KPI monitoring",
+                "Board-ready financial reporting and insights"
+            ),
+            "ai_features": MappingProxyType({
+                "predictive_analytics": "active",
+                "strategic_insights": "active",
+                "risk_assessment": "active",
+                "performance_analysis": "active"
+            })
+        })
         logger.info(f"{self.name} initialized with AI-powered strategic financial management")
     
     async def oversee_controller(self, controller_data: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -139,6 +177,12 @@ class AIDirector:
             min_balance = min(d["running_balance"] for d in daily_forecasts)
             risk_level = "high" if min_balance < 20000 else "medium" if min_balance < 50000 else "low"
             
+            recommendations = []
+            if min_balance < 30000:
+                recommendations.append("Maintain minimum balance of AED 30,000")
+            if risk_level == "high":
+                recommendations.append("Consider credit facility for cash flow smoothing")
+            
             forecast_summary = {
                 "forecast_period_days": days,
                 "current_balance": current_balance,
@@ -149,10 +193,7 @@ class AIDirector:
                 "ai_insights": {
                     "trend": "positive" if running_balance > current_balance else "negative",
                     "volatility": "low",  # Could calculate from variance
-                    "recommendations": [
-                        "Maintain minimum balance of AED 30,000" if min_balance < 30000 else None,
-                        "Consider credit facility for cash flow smoothing" if risk_level == "high" else None
-                    ]
+                    "recommendations": recommendations
                 }
             }
             
@@ -202,6 +243,14 @@ class AIDirector:
             revenue_growth = ((current_revenue - mock_pl_data["revenue"]["previous"]) / 
                             mock_pl_data["revenue"]["previous"] * 100) if mock_pl_data["revenue"]["previous"] > 0 else 0
             
+            strategic_recommendations = []
+            if gross_margin < self.kpi_targets["gross_margin"]:
+                strategic_recommendations.append("Focus on higher-margin products/services")
+            if operating_margin < self.kpi_targets["operating_margin"]:
+                strategic_recommendations.append("Review operational efficiency and cost structure")
+            if revenue_growth < 5:
+                strategic_recommendations.append("Investigate revenue growth opportunities")
+            
             pl_summary = {
                 "period": period,
                 "financial_metrics": {
@@ -228,11 +277,7 @@ class AIDirector:
                         f"Gross margin of {gross_margin:.1%} is {'healthy' if gross_margin > 0.35 else 'concerning'}",
                         f"Operating efficiency {'improved' if operating_margin > 0.12 else 'needs attention'}"
                     ],
-                    "strategic_recommendations": [
-                        "Focus on higher-margin products/services" if gross_margin < self.kpi_targets["gross_margin"] else None,
-                        "Review operational efficiency and cost structure" if operating_margin < self.kpi_targets["operating_margin"] else None,
-                        "Investigate revenue growth opportunities" if revenue_growth < 5 else None
-                    ]
+                    "strategic_recommendations": strategic_recommendations
                 }
             }
             
@@ -274,13 +319,17 @@ class AIDirector:
                 }
             }
             
-            # Calculate totals
-            current_assets = sum(mock_balance_sheet["assets"]["current_assets"].values())
-            fixed_assets = sum(mock_balance_sheet["assets"]["fixed_assets"].values())
+            # Calculate totals (line items are fixed, so add them out explicitly)
+            ca = mock_balance_sheet["assets"]["current_assets"]
+            fa = mock_balance_sheet["assets"]["fixed_assets"]
+            current_assets = ca["cash"] + ca["accounts_receivable"] + ca["inventory"] + ca["prepaid_expenses"]
+            fixed_assets = fa["equipment"] + fa["accumulated_depreciation"]
             total_assets = current_assets + fixed_assets
-            
-            current_liabilities = sum(mock_balance_sheet["liabilities"]["current_liabilities"].values())
-            long_term_liabilities = sum(mock_balance_sheet["liabilities"]["long_term_liabilities"].values())
+
+            cl = mock_balance_sheet["liabilities"]["current_liabilities"]
+            ltl = mock_balance_sheet["liabilities"]["long_term_liabilities"]
+            current_liabilities = cl["accounts_payable"] + cl["accrued_expenses"] + cl["short_term_debt"]
+            long_term_liabilities = ltl["long_term_debt"]
             total_liabilities = current_liabilities + long_term_liabilities
             
             total_equity = total_assets - total_liabilities
@@ -406,17 +455,20 @@ class AIDirector:
             balance_sheet_data = await self.generate_balance_sheet()
             cash_forecast = await self.cash_flow_forecast(7)  # 7-day forecast
             
+            financial_metrics = pl_data.get("financial_metrics", {})
+            financial_ratios = balance_sheet_data.get("financial_ratios", {})
+            
             dashboard = {
                 "executive_summary": {
                     "period": "Current Month",
-                    "generated_at": datetime.now().isoformat(),
+                    "generated_at": _now_iso(),
                     "overall_status": "healthy"  # AI assessment
                 },
                 "key_metrics": {
-                    "revenue": pl_data.get("financial_metrics", {}).get("revenue", 0),
-                    "operating_profit": pl_data.get("financial_metrics", {}).get("operating_profit", 0),
+                    "revenue": financial_metrics.get("revenue", 0),
+                    "operating_profit": financial_metrics.get("operating_profit", 0),
                     "cash_position": balance_sheet_data.get("assets", {}).get("current_assets", 0),
-                    "current_ratio": balance_sheet_data.get("financial_ratios", {}).get("current_ratio", 0)
+                    "current_ratio": financial_ratios.get("current_ratio", 0)
                 },
                 "alerts": [],
                 "top_insights": [],
@@ -424,7 +476,7 @@ class AIDirector:
             }
             
             # Generate AI insights and alerts
-            operating_margin = pl_data.get("financial_metrics", {}).get("operating_margin", 0)
+            operating_margin = financial_metrics.get("operating_margin", 0)
             if operating_margin < self.kpi_targets["operating_margin"]:
                 dashboard["alerts"].append({
                     "type": "performance",
@@ -432,7 +484,7 @@ class AIDirector:
                     "message": f"Operating margin ({operating_margin:.1%}) below target ({self.kpi_targets['operating_margin']:.1%})"
                 })
             
-            current_ratio = balance_sheet_data.get("financial_ratios", {}).get("current_ratio", 0)
+            current_ratio = financial_ratios.get("current_ratio", 0)
             if current_ratio < 1.5:
                 dashboard["alerts"].append({
                     "type": "liquidity",
@@ -473,29 +525,13 @@ class AIDirector:
     
     async def get_status(self) -> Dict[str, Any]:
         """Get enhanced director status with AI strategic capabilities"""
+        template = self._status_template
         return {
-            "name": self.name,
-            "agent": self.name,
-            "status": "active",
-            "last_activity": "AI-powered strategic financial management and oversight active",
-            "capabilities": [
-                "AI-enhanced controller oversight with strategic analysis",
-                "Predictive cash flow forecasting with ML models",
-                "AI-powered P&L analysis with trend insights",
-                "Intelligent balance sheet analysis and health scoring",
-                "Smart payment authorization with risk assessment",
-                "Executive dashboard with AI business intelligence",
-                "Strategic planning and KPI monitoring",
-                "Board-ready financial reporting and insights"
-            ],
-            "ai_features": {
-                "predictive_analytics": "active",
-                "strategic_insights": "active",
-                "risk_assessment": "active",
-                "performance_analysis": "active"
-            },
-            "payment_limits": self.payment_limits,
-            "kpi_targets": self.kpi_targets
+            **template,
+            "capabilities": list(template["capabilities"]),
+            "ai_features": dict(template["ai_features"]),
+            "payment_limits": dict(self.payment_limits),
+            "kpi_targets": dict(self.kpi_targets)
         }
 
 
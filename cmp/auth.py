@@ -4,27 +4,74 @@ Authentication and Security Utilities
 Handles JWT token creation, password hashing, and user authentication for CMP.
 """
 
+import asyncio
+import base64
+import binascii
 import datetime as dt
+import functools
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any
-from passlib.context import CryptContext
-from jose import jwt, JWTError
+import bcrypt
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import Row, bindparam, case, select, update
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 from .config import settings
+from .db import session_scope
 from .models import User, UserRole
 from .logging_config import get_logger
 
 logger = get_logger("auth")
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # JWT configuration
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Lowest bcrypt cost accepted when env == "production"
+MIN_PRODUCTION_BCRYPT_ROUNDS = 10
+
+# Dedicated pool so concurrent logins can't starve the default executor
+_bcrypt_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="bcrypt")
+
+# Verified token payloads, keyed by SHA-256 of the token string
+TOKEN_CACHE_MAXSIZE = 10000
+TOKEN_CACHE_TTL_SECONDS = 30
+_token_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+_token_cache_lock = threading.RLock()
+
+# last_login stamps waiting to be written in one batched UPDATE
+LAST_LOGIN_FLUSH_SECONDS = 5
+_pending_logins: Dict[int, dt.datetime] = {}
+_pending_logins_lock = threading.Lock()
+
+# Narrow column sets for the hot auth paths (avoid loading full ORM rows)
+_LOGIN_COLUMNS = (User.id, User.email, User.full_name, User.role, User.is_active, User.hashed_password)
+_SNAPSHOT_COLUMNS = (User.id, User.email, User.full_name, User.role, User.is_active, User.created_at, User.last_login)
+
+# Per-request lookups are built once and executed with bound parameters
+_LOGIN_BY_EMAIL = select(*_LOGIN_COLUMNS).where(User.email == bindparam("email"))
+_SNAPSHOT_BY_ID = select(*_SNAPSHOT_COLUMNS).where(User.id == bindparam("user_id"))
+
+# Detached user snapshots for token-authenticated requests, keyed by user id
+USER_CACHE_MAXSIZE = 5000
+USER_CACHE_TTL_SECONDS = 60
+_user_cache: "OrderedDict[int, tuple]" = OrderedDict()
+_user_cache_lock = threading.RLock()
+
 
 class AuthenticationError(Exception):
     """Raised when authentication fails"""
@@ -36,22 +83,132 @@ class AuthorizationError(Exception):
     pass
 
 
+class InvalidTokenError(Exception):
+    """Raised when a JWT is malformed, forged or expired"""
+    pass
+
+
+@functools.lru_cache(maxsize=1)
 def get_secret_key() -> str:
-    """Get JWT secret key from settings"""
+    """Get JWT secret key from settings (resolved once per process)"""
     secret = settings.jwt_secret_key or "your-super-secret-jwt-key-change-in-production"
     if secret == "your-super-secret-jwt-key-change-in-production":
         logger.warning("Using default JWT secret key - change this in production!")
     return secret
 
 
+def check_bcrypt_rounds() -> None:
+    """Refuse to run production with a weak bcrypt cost.
+
+    Each round step doubles both login latency and the attacker's cost per
+    guess, so dev/test may drop to 4-10 for speed while production keeps >= 10.
+    """
+    if settings.env == "production" and settings.bcrypt_rounds < MIN_PRODUCTION_BCRYPT_ROUNDS:
+        raise RuntimeError(
+            f"bcrypt_rounds={settings.bcrypt_rounds} is too low for production "
+            f"(minimum {MIN_PRODUCTION_BCRYPT_ROUNDS})"
+        )
+
+
 def hash_password(password: str) -> str:
     """Hash a plain password"""
-    return pwd_context.hash(password)
+    salt = bcrypt.gensalt(rounds=settings.bcrypt_rounds)
+    return bcrypt.hashpw(password.encode(), salt).decode()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+
+
+@functools.lru_cache(maxsize=1)
+def _dummy_password_hash() -> str:
+    """Hash at the configured cost, verified for unknown/inactive users so they cost the same as a wrong password"""
+    return hash_password(secrets.token_urlsafe(16))
+
+
+def prime_dummy_password_hash() -> None:
+    """Compute the dummy hash at startup; done lazily, the first unknown-email login would pay an extra bcrypt hash"""
+    _dummy_password_hash()
+
+
+def _b64url_encode(raw: bytes) -> bytes:
+    """Base64url-encode without padding, as JWT requires"""
+    return base64.urlsafe_b64encode(raw).rstrip(b"=")
+
+
+def _b64url_decode(segment: bytes) -> bytes:
+    """Decode an unpadded base64url JWT segment"""
+    return base64.urlsafe_b64decode(segment + b"=" * (-len(segment) % 4))
+
+
+_HS256_HEADER = _b64url_encode(b'{"alg":"HS256","typ":"JWT"}')
+
+if ORJSON_AVAILABLE:
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+else:
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+    _json_loads = json.loads
+
+
+@functools.lru_cache(maxsize=4)
+def _hmac_prototype(secret: str) -> "hmac.HMAC":
+    """Keyed HMAC-SHA256 state, built once per secret and copied for each signature"""
+    return hmac.new(secret.encode(), digestmod=hashlib.sha256)
+
+
+def _hs256_sign(secret: str, signing_input: bytes) -> bytes:
+    """HMAC-SHA256 over signing_input, reusing the pre-keyed prototype"""
+    mac = _hmac_prototype(secret).copy()
+    mac.update(signing_input)
+    return mac.digest()
+
+
+def encode_hs256(payload: Dict[str, Any], secret: str) -> str:
+    """Sign a payload as an HS256 JWT using hashlib/OpenSSL HMAC-SHA256"""
+    body = _b64url_encode(_json_dumps(payload))
+    signing_input = _HS256_HEADER + b"." + body
+    signature = _hs256_sign(secret, signing_input)
+    return (signing_input + b"." + _b64url_encode(signature)).decode()
+
+
+def verify_hs256(token: str, secret: str) -> Dict[str, Any]:
+    """Verify an HS256 JWT and return its payload, enforcing exp"""
+    try:
+        header_b64, payload_b64, signature_b64 = token.encode("ascii").split(b".")
+    except (UnicodeEncodeError, ValueError):
+        raise InvalidTokenError("Not enough segments")
+    
+    try:
+        # Check the MAC on the raw segments first so forged tokens are rejected
+        # before any JSON parsing; only an HS256 MAC under our key can pass
+        signing_input = header_b64 + b"." + payload_b64
+        expected = _hs256_sign(secret, signing_input)
+        if not hmac.compare_digest(expected, _b64url_decode(signature_b64)):
+            raise InvalidTokenError("Signature verification failed")
+        
+        if header_b64 != _HS256_HEADER:
+            header = _json_loads(_b64url_decode(header_b64))
+            if not isinstance(header, dict) or header.get("alg") != ALGORITHM:
+                raise InvalidTokenError("The specified alg value is not allowed")
+        
+        payload = _json_loads(_b64url_decode(payload_b64))
+    except (binascii.Error, ValueError) as e:
+        raise InvalidTokenError(f"Invalid token encoding: {e}")
+    
+    if not isinstance(payload, dict):
+        raise InvalidTokenError("Invalid payload")
+    for claim in ("exp", "type"):
+        if claim not in payload:
+            raise InvalidTokenError(f'Token is missing the "{claim}" claim')
+    if not isinstance(payload["exp"], (int, float)):
+        raise InvalidTokenError("Expiration Time claim (exp) must be a number")
+    if payload["exp"] <= time.time():
+        raise InvalidTokenError("Signature has expired")
+    
+    return payload
 
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[dt.timedelta] = None) -> str:
@@ -59,87 +216,187 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[dt.timedel
     to_encode = data.copy()
     
     if expires_delta:
-        expire = dt.datetime.utcnow() + expires_delta
+        expire = int(time.time()) + int(expires_delta.total_seconds())
     else:
-        expire = dt.datetime.utcnow() + dt.timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = int(time.time()) + ACCESS_TOKEN_EXPIRE_MINUTES * 60
     
     to_encode.update({"exp": expire, "type": "access"})
     
-    encoded_jwt = jwt.encode(to_encode, get_secret_key(), algorithm=ALGORITHM)
-    return encoded_jwt
+    return encode_hs256(to_encode, get_secret_key())
 
 
 def create_refresh_token(data: Dict[str, Any]) -> str:
     """Create a JWT refresh token"""
     to_encode = data.copy()
-    expire = dt.datetime.utcnow() + dt.timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    expire = int(time.time()) + REFRESH_TOKEN_EXPIRE_DAYS * 86400
     to_encode.update({"exp": expire, "type": "refresh"})
     
-    encoded_jwt = jwt.encode(to_encode, get_secret_key(), algorithm=ALGORITHM)
-    return encoded_jwt
+    return encode_hs256(to_encode, get_secret_key())
+
+
+def _cache_put(cache: "OrderedDict[Any, tuple]", maxsize: int, key: Any, expires_at: float, value: Any, now: float) -> None:
+    """Insert (expires_at, value) under key, evicting oldest-first when full (caller holds the lock)"""
+    # Re-inserting moves the key to the newest end, so insertion order tracks
+    # expiry order; expired entries are swept from the oldest end, each popped
+    # at most once, so an insert is O(1) amortized
+    cache.pop(key, None)
+    if len(cache) >= maxsize:
+        while cache and next(iter(cache.values()))[0] <= now:
+            cache.popitem(last=False)
+        if len(cache) >= maxsize:
+            cache.popitem(last=False)
+    cache[key] = (expires_at, value)
+
+
+def _cache_token_payload(key: bytes, payload: Dict[str, Any], now: float) -> None:
+    """Remember a verified payload until the cache TTL or the token expiry"""
+    exp = payload.get("exp")
+    if not isinstance(exp, (int, float)):
+        return
+    ttl = min(TOKEN_CACHE_TTL_SECONDS, exp - now)
+    if ttl <= 0:
+        return
+    
+    with _token_cache_lock:
+        _cache_put(_token_cache, TOKEN_CACHE_MAXSIZE, key, now + ttl, payload, now)
+
+
+def _decode_token(token: str) -> Dict[str, Any]:
+    """Decode a JWT, reusing the payload of a recently verified identical token"""
+    key = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+    
+    with _token_cache_lock:
+        entry = _token_cache.get(key)
+    if entry is not None and entry[0] > now:
+        return dict(entry[1])
+    
+    payload = verify_hs256(token, get_secret_key())
+    _cache_token_payload(key, payload, now)
+    return dict(payload)
 
 
 def verify_token(token: str, token_type: str = "access") -> Dict[str, Any]:
     """Verify and decode a JWT token"""
     try:
-        payload = jwt.decode(token, get_secret_key(), algorithms=[ALGORITHM])
+        payload = _decode_token(token)
         
-        # Check token type
+        # Expiry is enforced by verify_hs256; cached payloads never outlive exp
         if payload.get("type") != token_type:
             raise AuthenticationError(f"Invalid token type. Expected {token_type}")
         
-        # Check expiration
-        exp = payload.get("exp")
-        if exp is None:
-            raise AuthenticationError("Token missing expiration")
-        
-        if dt.datetime.utcnow() > dt.datetime.fromtimestamp(exp):
-            raise AuthenticationError("Token has expired")
-        
         return payload
         
-    except JWTError as e:
-        logger.warning(f"JWT verification failed: {e}")
+    except InvalidTokenError as e:
+        logger.warning("JWT verification failed: %s", e)
         raise AuthenticationError(f"Invalid token: {e}")
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    """Authenticate a user with email and password"""
+def _get_login_candidate(db: Session, email: str) -> Optional[Row]:
+    """Look up the login columns of an active user, logging why a lookup is rejected"""
+    user = db.execute(_LOGIN_BY_EMAIL, {"email": email}).first()
+    
+    if not user:
+        logger.info("Authentication failed: user %s not found", email)
+        return None
+    
+    if not user.is_active:
+        logger.info("Authentication failed: user %s is inactive", email)
+        return None
+    
+    return user
+
+
+def _record_login(row: Row) -> User:
+    """Queue the last login stamp for the batch writer and return the authenticated user"""
+    last_login = dt.datetime.now(dt.timezone.utc)
+    with _pending_logins_lock:
+        _pending_logins[row.id] = last_login
+    logger.info("User %s authenticated successfully", row.email)
+    return User(
+        id=row.id,
+        email=row.email,
+        full_name=row.full_name,
+        role=row.role,
+        is_active=row.is_active,
+        last_login=last_login
+    )
+
+
+def _check_credentials(db: Session, email: str, password: str) -> Optional[User]:
+    """Look up and verify a login; blocking (DB query + bcrypt)"""
     try:
-        user = db.execute(select(User).where(User.email == email)).scalar_one_or_none()
+        user = _get_login_candidate(db, email)
         
-        if not user:
-            logger.info(f"Authentication failed: user {email} not found")
+        # Always pay one bcrypt verify so response time doesn't reveal which emails exist
+        hashed_password = user.hashed_password if user else _dummy_password_hash()
+        if not verify_password(password, hashed_password) or not user:
+            if user:
+                logger.info("Authentication failed: invalid password for %s", email)
             return None
         
-        if not user.is_active:
-            logger.info(f"Authentication failed: user {email} is inactive")
-            return None
-        
-        if not verify_password(password, user.hashed_password):
-            logger.info(f"Authentication failed: invalid password for {email}")
-            return None
-        
-        # Update last login
-        user.last_login = dt.datetime.now(dt.timezone.utc)
-        db.commit()
-        
-        logger.info(f"User {email} authenticated successfully")
-        return user
+        return _record_login(user)
         
     except Exception as e:
-        logger.error(f"Authentication error for {email}: {e}")
+        logger.error("Authentication error for %s: %s", email, e)
         return None
 
 
+def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+    """Authenticate a user with email and password"""
+    return _check_credentials(db, email, password)
+
+
+async def authenticate_user_async(db: Session, email: str, password: str) -> Optional[User]:
+    """Authenticate a user, running the lookup and bcrypt verify off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_executor, _check_credentials, db, email, password)
+
+
+def flush_pending_logins() -> int:
+    """Write queued last_login stamps in a single UPDATE; returns rows written"""
+    with _pending_logins_lock:
+        pending = dict(_pending_logins)
+        _pending_logins.clear()
+    if not pending:
+        return 0
+    
+    try:
+        with session_scope() as db:
+            db.execute(
+                update(User)
+                .where(User.id.in_(pending))
+                .values(last_login=case(pending, value=User.id))
+            )
+    except Exception as e:
+        logger.error("Failed to flush %s last_login updates: %s", len(pending), e)
+        with _pending_logins_lock:
+            for user_id, last_login in pending.items():
+                _pending_logins.setdefault(user_id, last_login)
+        return 0
+    
+    # Cached snapshots still carry the old last_login; the login itself leaves
+    # the cache alone, so a stamp reaches cached readers only once written
+    for user_id in pending:
+        invalidate_user(user_id)
+    return len(pending)
+
+
+async def run_login_flusher() -> None:
+    """Periodically flush queued last_login stamps until cancelled"""
+    while True:
+        await asyncio.sleep(LAST_LOGIN_FLUSH_SECONDS)
+        await asyncio.to_thread(flush_pending_logins)
+
+
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     """Get user by email"""
-    return db.execute(select(User).where(User.email == email)).scalar_one_or_none()
+    return db.scalar(select(User).where(User.email == email))
 
 
 def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
     """Get user by ID"""
-    return db.execute(select(User).where(User.id == user_id)).scalar_one_or_none()
+    return db.scalar(select(User).where(User.id == user_id))
 
 
 def create_user(db: Session, email: str, password: str, full_name: str, role: UserRole = UserRole.VIEWER) -> User:
@@ -163,7 +420,7 @@ def create_user(db: Session, email: str, password: str, full_name: str, role: Us
     db.commit()
     db.refresh(user)
     
-    logger.info(f"Created user {email} with role {role.value}")
+    logger.info("Created user %s with role %s", email, role.value)
     return user
 
 
@@ -173,6 +430,53 @@ def require_permission(user: User, required_role: UserRole) -> None:
         raise AuthorizationError(f"User {user.email} lacks required permission: {required_role.value}")
 
 
+def invalidate_user(user_id: int) -> None:
+    """Forget the cached snapshot of a user after their account changes"""
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
+
+def _snapshot_user(user: User) -> User:
+    """Copy the fields request handlers use into a session-less User"""
+    return User(
+        id=user.id,
+        email=user.email,
+        full_name=user.full_name,
+        role=user.role,
+        is_active=user.is_active,
+        created_at=user.created_at,
+        last_login=user.last_login
+    )
+
+
+def _get_cached_user(user_id: int, claims: Dict[str, Any]) -> Optional[User]:
+    """Return a fresh copy of a cached user whose email and role still match the token"""
+    with _user_cache_lock:
+        entry = _user_cache.get(user_id)
+    if entry is None or entry[0] <= time.time():
+        return None
+    
+    user = entry[1]
+    if claims.get("email", user.email) != user.email or claims.get("role", user.role.value) != user.role.value:
+        return None
+    return _snapshot_user(user)
+
+
+def _cache_user(user: User) -> None:
+    """Remember an active user's snapshot for USER_CACHE_TTL_SECONDS"""
+    now = time.time()
+    with _user_cache_lock:
+        _cache_put(_user_cache, USER_CACHE_MAXSIZE, user.id, now + USER_CACHE_TTL_SECONDS, _snapshot_user(user), now)
+
+
+def _load_user_snapshot(db: Session, user_id: int) -> Optional[User]:
+    """Load a session-less User with only the columns request handlers read"""
+    row = db.execute(_SNAPSHOT_BY_ID, {"user_id": user_id}).first()
+    if row is None:
+        return None
+    return User(**row._asdict())
+
+
 def get_current_user_from_token(db: Session, token: str) -> User:
     """Get current user from JWT token"""
     try:
@@ -182,12 +486,17 @@ def get_current_user_from_token(db: Session, token: str) -> User:
         if user_id is None:
             raise AuthenticationError("Token missing user ID")
         
-        user = get_user_by_id(db, int(user_id))
+        user_id = int(user_id)
+        user = _get_cached_user(user_id, payload)
         if user is None:
-            raise AuthenticationError("User not found")
-        
-        if not user.is_active:
-            raise AuthenticationError("User is inactive")
+            user = _load_user_snapshot(db, user_id)
+            if user is None:
+                raise AuthenticationError("User not found")
+            
+            if not user.is_active:
+                raise AuthenticationError("User is inactive")
+            
+            _cache_user(user)
         
         return user
         
@@ -1,15 +1,31 @@
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     database_url: str | None = None
     env: str = "development"
     
+    # Connection pool sizing (ignored for SQLite)
+    db_pool_size: int = 20
+    db_max_overflow: int = 40
+    
     # JWT Authentication Configuration
     jwt_secret_key: str | None = None
     jwt_algorithm: str = "HS256"
     jwt_access_token_expire_minutes: int = 30
     jwt_refresh_token_expire_days: int = 7
     
+    # Password hashing cost (bcrypt log2 rounds). Every +1 doubles login
+    # latency and brute-force cost; dev/test may lower it, production needs >= 10
+    bcrypt_rounds: int = 12
+    
+    # Keep the ledger's last hash in memory instead of SELECTing it per append.
+    # Only safe when this process is the sole ledger writer; disable otherwise
+    ledger_tail_cache: bool = True
+    # Seconds an append waits for another transaction's ledger write to commit
+    ledger_writer_timeout: float = 10.0
+    
     # Zoho Books API Configuration
     zoho_client_id: str | None = None
     zoho_client_secret: str | None = None
@@ -34,9 +50,13 @@ class Settings(BaseSettings):
     api_rate_limit: int = 100  # requests per minute
     api_timeout: int = 30  # seconds
 
-    class Config:
-        env_file = ".env"
-        env_prefix = ""
-        case_sensitive = False
+    model_config = SettingsConfigDict(env_file=".env", env_prefix="", case_sensitive=False, extra="ignore")
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Parse environment and .env once per process"""
+    return Settings()
+
 
-settings = Settings()
+settings = get_settings()
@@ -1,11 +1,21 @@
 from __future__ import annotations
 
+import json
+import math
+import re
 from contextlib import contextmanager
-from typing import Iterator
+from typing import Any, Iterator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, Session, declarative_base
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from .config import settings
 
 Base = declarative_base()
@@ -16,10 +26,84 @@ def _get_default_sqlite_url() -> str:
     return "sqlite+pysqlite:///cmp.db"
 
 
+# Per-connection SQLite tuning: WAL lets readers proceed during writes
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=134217728",
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in _SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def _has_non_finite_float(value: Any) -> bool:
+    """True if a NaN or +/-Infinity float occurs anywhere in a JSON-able value"""
+    if type(value) is float:
+        return not math.isfinite(value)
+    if isinstance(value, dict):
+        return any(_has_non_finite_float(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_has_non_finite_float(item) for item in value)
+    return False
+
+
+def _json_serializer(value: Any) -> str:
+    """JSON column encoder: orjson when it round-trips the value, else json"""
+    if ORJSON_AVAILABLE:
+        try:
+            encoded = orjson.dumps(value)
+        except TypeError:  # non-str keys, ints beyond 64 bits
+            encoded = None
+        # orjson writes NaN/Infinity as null, which would change the value (and
+        # a reloaded ledger entry's hash); json keeps them. Only output that
+        # contains a null can hide one, so only that output is checked
+        if encoded is not None and (b"null" not in encoded or not _has_non_finite_float(value)):
+            return encoded.decode()
+    return json.dumps(value)
+
+
+# orjson silently reads integers beyond 64 bits back as floats; such values
+# only get stored through the json fallback. Match bare integer tokens (after
+# "[", "," or ":") too wide for orjson, not digit runs inside strings
+_WIDE_INT_RE = re.compile(r'(?:^|[\[,:])\s*(?:-\d{19}|\d{20})')
+
+
+def _json_deserializer(raw: str) -> Any:
+    if ORJSON_AVAILABLE and _WIDE_INT_RE.search(raw) is None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:  # NaN/Infinity written by json
+            pass
+    return json.loads(raw)
+
+
+# Engine-wide so every JSON column (ledger data, OCR payloads) uses them
+_JSON_CODEC = {"json_serializer": _json_serializer, "json_deserializer": _json_deserializer}
+
+
 def _make_engine(url: str | None):
     url = url or _get_default_sqlite_url()
-    connect_args = {"check_same_thread": False} if url.startswith("sqlite+") else {}
-    return create_engine(url, echo=False, future=True, connect_args=connect_args)
+    if make_url(url).get_backend_name() == "sqlite":
+        engine = create_engine(url, echo=False, future=True, connect_args={"check_same_thread": False}, **_JSON_CODEC)
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+        return engine
+    return create_engine(
+        url,
+        echo=False,
+        future=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_pre_ping=True,
+        **_JSON_CODEC,
+    )
 
 
 engine = _make_engine(settings.database_url)
@@ -28,8 +112,12 @@ SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, futu
 
 def init_db() -> None:
     # Import models so they are registered with Base
-    from . import models  # noqa: F401
+    from . import models
     Base.metadata.create_all(bind=engine)
+    # create_all skips the indexes of tables that already exist; add ones
+    # introduced since a database was created (CREATE INDEX only if missing)
+    for index in models.LedgerEntry.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
 
 
 @contextmanager
@@ -5,11 +5,34 @@ Handles UAE FTA-compliant e-invoices and real banking integrations for UAE marke
 Updated to use actual UAE banking APIs and file import methods.
 """
 
-from typing import Dict, Any, List, Optional
-import uuid
-from datetime import datetime
+import asyncio
+import csv
+import functools
+import importlib
+import json
+import logging
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
+from itertools import chain, islice
+import re
+import secrets
+import time
+from datetime import date, datetime, timedelta
 from pathlib import Path
 import httpx
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+try:
+    import h2  # noqa: F401 - enables httpx HTTP/2 support
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 from ..logging_config import get_logger
 from ..config import settings
@@ -17,12 +40,71 @@ from ..config import settings
 logger = get_logger("integrations.invoices")
 
 
-def generate_uae_einvoice(invoice_data: Dict[str, Any]) -> Dict[str, Any]:
+@dataclass(slots=True, frozen=True)
+class EInvoiceParty:
+    """Supplier or customer block of a UAE e-invoice"""
+    name: str = ""
+    vat_number: str = ""
+    address: str = ""
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "vat_number": self.vat_number, "address": self.address}
+
+
+@dataclass(slots=True, frozen=True)
+class EInvoiceTotals:
+    """Monetary totals block of a UAE e-invoice"""
+    subtotal: float = 0
+    vat_amount: float = 0
+    total: float = 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"subtotal": self.subtotal, "vat_amount": self.vat_amount, "total": self.total}
+
+
+@dataclass(slots=True, frozen=True)
+class UaeEInvoice:
+    """UAE FTA e-invoice; field order matches the serialized document"""
+    invoice_id: str = ""
+    issue_date: str = ""
+    invoice_type: str = "388"  # Standard commercial invoice
+    currency: str = "AED"
+    supplier: EInvoiceParty = field(default_factory=EInvoiceParty)
+    customer: EInvoiceParty = field(default_factory=EInvoiceParty)
+    line_items: List[Dict[str, Any]] = field(default_factory=list)
+    totals: EInvoiceTotals = field(default_factory=EInvoiceTotals)
+    vat_breakdown: List[Dict[str, Any]] = field(default_factory=list)
+    # UAE-specific fields
+    invoice_hash: str = ""  # TODO: Generate cryptographic hash
+    qr_code: str = ""       # TODO: Generate QR code for verification
+    digital_signature: str = ""  # TODO: Digital signature if required
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize field by field; dataclasses.asdict deep-copies every leaf"""
+        return {
+            "invoice_id": self.invoice_id,
+            "issue_date": self.issue_date,
+            "invoice_type": self.invoice_type,
+            "currency": self.currency,
+            "supplier": self.supplier.to_dict(),
+            "customer": self.customer.to_dict(),
+            "line_items": self.line_items,
+            "totals": self.totals.to_dict(),
+            "vat_breakdown": self.vat_breakdown,
+            "invoice_hash": self.invoice_hash,
+            "qr_code": self.qr_code,
+            "digital_signature": self.digital_signature
+        }
+
+
+def generate_uae_einvoice(invoice_data: Dict[str, Any], issue_date: Optional[str] = None) -> Dict[str, Any]:
     """
     Generate UAE FTA-compliant e-invoice
     
     Args:
         invoice_data: Invoice details including amount, vendor, items, etc.
+        issue_date: ISO timestamp to stamp on the invoice; pass one value when
+            generating a batch so the clock is read once. Defaults to now.
     
     Returns:
         Dictionary containing the e-invoice in UAE-compliant format
@@ -31,36 +113,79 @@ def generate_uae_einvoice(invoice_data: Dict[str, Any]) -> Dict[str, Any]:
     # TODO: Implement actual UAE e-invoice format per FTA specifications
     # This is a placeholder structure
     
-    einvoice = {
-        "invoice_id": invoice_data.get("invoice_id", f"INV-{uuid.uuid4().hex[:8].upper()}"),
-        "issue_date": datetime.now().isoformat(),
-        "invoice_type": "388",  # Standard commercial invoice
-        "currency": "AED",
-        "supplier": {
-            "name": invoice_data.get("supplier_name", ""),
-            "vat_number": invoice_data.get("supplier_vat", ""),
-            "address": invoice_data.get("supplier_address", "")
-        },
-        "customer": {
-            "name": invoice_data.get("customer_name", ""),
-            "vat_number": invoice_data.get("customer_vat", ""),
-            "address": invoice_data.get("customer_address", "")
-        },
-        "line_items": invoice_data.get("line_items", []),
-        "totals": {
-            "subtotal": invoice_data.get("subtotal", 0),
-            "vat_amount": invoice_data.get("vat_amount", 0),
-            "total": invoice_data.get("total", 0)
-        },
-        "vat_breakdown": invoice_data.get("vat_breakdown", []),
-        # UAE-specific fields
-        "invoice_hash": "",  # TODO: Generate cryptographic hash
-        "qr_code": "",       # TODO: Generate QR code for verification
-        "digital_signature": ""  # TODO: Digital signature if required
-    }
+    if "invoice_id" in invoice_data:
+        invoice_id = invoice_data["invoice_id"]
+    else:
+        invoice_id = f"INV-{secrets.token_hex(4).upper()}"
     
-    logger.info(f"Generated UAE e-invoice: {einvoice['invoice_id']}")
-    return einvoice
+    einvoice = UaeEInvoice(
+        invoice_id=invoice_id,
+        issue_date=issue_date or datetime.now().isoformat(),
+        supplier=EInvoiceParty(
+            name=invoice_data.get("supplier_name", ""),
+            vat_number=invoice_data.get("supplier_vat", ""),
+            address=invoice_data.get("supplier_address", "")
+        ),
+        customer=EInvoiceParty(
+            name=invoice_data.get("customer_name", ""),
+            vat_number=invoice_data.get("customer_vat", ""),
+            address=invoice_data.get("customer_address", "")
+        ),
+        line_items=invoice_data.get("line_items", []),
+        totals=EInvoiceTotals(
+            subtotal=invoice_data.get("subtotal", 0),
+            vat_amount=invoice_data.get("vat_amount", 0),
+            total=invoice_data.get("total", 0)
+        ),
+        vat_breakdown=invoice_data.get("vat_breakdown", [])
+    )
+    
+    logger.info("Generated UAE e-invoice: %s", einvoice.invoice_id)
+    return einvoice.to_dict()
+
+
+class EInvoicePartySchema(BaseModel):
+    """Validation schema for an e-invoice supplier/customer block"""
+    model_config = ConfigDict(extra="forbid")
+    
+    name: str = ""
+    vat_number: str = ""
+    address: str = ""
+
+
+class EInvoiceTotalsSchema(BaseModel):
+    """Validation schema for e-invoice totals"""
+    model_config = ConfigDict(extra="forbid")
+    
+    subtotal: float = 0
+    vat_amount: float = 0
+    total: float = 0
+
+
+class UaeEInvoiceSchema(BaseModel):
+    """Validation schema for a serialized UaeEInvoice; fields without defaults are required"""
+    model_config = ConfigDict(extra="forbid")
+    
+    invoice_id: str
+    issue_date: str
+    invoice_type: str = "388"
+    currency: str = "AED"
+    supplier: EInvoicePartySchema
+    customer: EInvoicePartySchema
+    line_items: List[Dict[str, Any]] = []
+    totals: EInvoiceTotalsSchema
+    vat_breakdown: List[Dict[str, Any]] = []
+    invoice_hash: str = ""
+    qr_code: str = ""
+    digital_signature: str = ""
+
+
+def _einvoice_error_message(error: Dict[str, Any]) -> str:
+    """Human-readable message for one pydantic validation error"""
+    location = ".".join(str(part) for part in error["loc"])
+    if error["type"] == "missing":
+        return f"Missing required field: {location}"
+    return f"Invalid field {location}: {error['msg']}"
 
 
 def validate_uae_einvoice(einvoice: Dict[str, Any]) -> Dict[str, Any]:
@@ -75,16 +200,20 @@ def validate_uae_einvoice(einvoice: Dict[str, Any]) -> Dict[str, Any]:
     """
     
     # TODO: Implement actual UAE e-invoice validation rules
-    errors = []
     warnings = []
     
-    # Basic validation checks (placeholder)
-    required_fields = ["invoice_id", "issue_date", "supplier", "customer", "totals"]
-    for field in required_fields:
-        if field not in einvoice:
-            errors.append(f"Missing required field: {field}")
+    # Schema validation runs in pydantic-core rather than Python loops
+    try:
+        UaeEInvoiceSchema.model_validate(einvoice)
+        errors = []
+    except ValidationError as e:
+        errors = [_einvoice_error_message(error) for error in e.errors()]
     
-    logger.info(f"Validated e-invoice {einvoice.get('invoice_id', 'UNKNOWN')}: {len(errors)} errors, {len(warnings)} warnings")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Validated e-invoice %s: %s errors, %s warnings",
+            einvoice.get('invoice_id', 'UNKNOWN'), len(errors), len(warnings)
+        )
     
     return {
         "valid": len(errors) == 0,
@@ -93,7 +222,108 @@ def validate_uae_einvoice(einvoice: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-class ZohoBooksConnector:
+# Zoho access tokens shared by connector instances in this process:
+# client_id -> (access_token, monotonic time after which to refresh)
+_zoho_token_cache: Dict[str, Tuple[str, float]] = {}
+
+# Refresh this long before Zoho's stated expiry
+ZOHO_TOKEN_REFRESH_MARGIN_SECONDS = 60
+
+ZOHO_TOKEN_URL = "https://accounts.zoho.com/oauth/v2/token"
+
+# Invoices created in parallel by create_invoices_bulk
+ZOHO_BULK_CONCURRENCY = 16
+
+# How long Emirates NBD read-mostly responses are served from memory
+ENBD_BALANCE_CACHE_TTL_SECONDS = 30
+ENBD_DETAILS_CACHE_TTL_SECONDS = 3600
+
+# Transaction history is fetched in date windows of this many days, with at
+# most this many windows in flight to stay inside the bank's rate limit
+ENBD_TRANSACTION_WINDOW_DAYS = 7
+ENBD_MAX_CONCURRENT_WINDOWS = 8
+# Most transactions the API returns per request; a full page may be truncated
+ENBD_TRANSACTION_PAGE_LIMIT = 100
+
+@functools.lru_cache(maxsize=None)
+def _lazy_import(name: str) -> Optional[Any]:
+    """Import an optional module on first use, or None if it is not installed"""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+# Keep-alive pool shared by all requests of one connector
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+
+
+def _encode_json_body(data: Optional[Dict]) -> Optional[bytes]:
+    """Serialize a request body, with orjson when available"""
+    if data is None:
+        return None
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data)
+    return json.dumps(data).encode()
+
+
+def _decode_json_response(response: httpx.Response) -> Any:
+    """Parse a response body, with orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+class _PooledClientMixin:
+    """Lazily created, long-lived httpx.AsyncClient so connections are reused"""
+    
+    _client: Optional[httpx.AsyncClient] = None
+    _client_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled client, (re)creating it for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(timeout=settings.api_timeout, transport=self._make_transport())
+            self._client_loop = loop
+        return self._client
+    
+    def _make_transport(self) -> httpx.AsyncHTTPTransport:
+        """Transport for the pooled client; subclasses may wrap requests"""
+        return httpx.AsyncHTTPTransport(limits=HTTP_LIMITS, http2=HTTP2_AVAILABLE)
+    
+    async def aclose(self) -> None:
+        """Close pooled connections (called on application shutdown)"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+
+
+class _ZohoAuthRefreshTransport(httpx.AsyncHTTPTransport):
+    """Refreshes the Zoho access token and retries once when an API call returns 401"""
+    
+    def __init__(self, connector: "ZohoBooksConnector", **kwargs):
+        super().__init__(**kwargs)
+        self._connector = connector
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await super().handle_async_request(request)
+        
+        # The token endpoint itself goes through this transport; never recurse
+        if response.status_code != 401 or str(request.url) == ZOHO_TOKEN_URL:
+            return response
+        
+        logger.info("Access token expired, attempting refresh")
+        if not await self._connector.refresh_access_token():
+            return response
+        
+        await response.aclose()
+        request.headers["Authorization"] = f"Zoho-oauthtoken {self._connector.access_token}"
+        return await super().handle_async_request(request)
+
+
+class ZohoBooksConnector(_PooledClientMixin):
     """Production Zoho Books API client with OAuth 2.0 authentication"""
     
     def __init__(self, client_id: str = "", client_secret: str = "", access_token: str = "", 
@@ -105,6 +335,13 @@ class ZohoBooksConnector:
         self.organization_id = organization_id or settings.zoho_organization_id or ""
         self.base_url = base_url or settings.zoho_base_url
         
+        # Token expiry is unknown until we refresh; 0 means "don't refresh proactively"
+        self._expires_at = 0.0
+        self._refresh_lock = asyncio.Lock()
+        cached = _zoho_token_cache.get(self.client_id)
+        if cached and not access_token:
+            self.access_token, self._expires_at = cached
+        
         # Check if we have credentials for production use
         self.is_configured = bool(self.client_id and self.client_secret and self.organization_id)
         
@@ -122,40 +359,59 @@ class ZohoBooksConnector:
             "Content-Type": "application/json"
         }
     
+    def _make_transport(self) -> httpx.AsyncHTTPTransport:
+        return _ZohoAuthRefreshTransport(self, limits=HTTP_LIMITS, http2=HTTP2_AVAILABLE)
+    
+    def _token_expiring(self) -> bool:
+        """True once the current token is inside its refresh margin"""
+        return bool(self._expires_at) and time.monotonic() >= self._expires_at
+    
     async def refresh_access_token(self) -> bool:
         """Refresh expired access token using refresh token"""
         if not self.refresh_token or not self.client_id or not self.client_secret:
             return False
         
+        stale_token = self.access_token
+        async with self._refresh_lock:
+            # Another caller refreshed while we waited for the lock
+            if self.access_token != stale_token and not self._token_expiring():
+                return True
+            return await self._request_new_access_token()
+    
+    async def _request_new_access_token(self) -> bool:
+        """Exchange the refresh token for a new access token and record its expiry"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://accounts.zoho.com/oauth/v2/token",
-                    data={
-                        "refresh_token": self.refresh_token,
-                        "client_id": self.client_id,
-                        "client_secret": self.client_secret,
-                        "grant_type": "refresh_token"
-                    }
+            response = await self._get_client().post(
+                ZOHO_TOKEN_URL,
+                data={
+                    "refresh_token": self.refresh_token,
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                    "grant_type": "refresh_token"
+                }
+            )
+            
+            if response.status_code == 200:
+                data = _decode_json_response(response)
+                self.access_token = data.get("access_token", "")
+                self._expires_at = (
+                    time.monotonic() + data.get("expires_in", 3600) - ZOHO_TOKEN_REFRESH_MARGIN_SECONDS
                 )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    self.access_token = data.get("access_token", "")
-                    logger.info("Zoho access token refreshed successfully")
-                    return True
-                else:
-                    logger.error(f"Failed to refresh Zoho token: {response.status_code}")
-                    return False
+                _zoho_token_cache[self.client_id] = (self.access_token, self._expires_at)
+                logger.info("Zoho access token refreshed successfully")
+                return True
+            else:
+                logger.error("Failed to refresh Zoho token: %s", response.status_code)
+                return False
         except Exception as e:
-            logger.error(f"Error refreshing Zoho token: {e}")
+            logger.error("Error refreshing Zoho token: %s", e)
             return False
     
     async def _make_zoho_request(self, method: str, endpoint: str, data: Optional[Dict] = None,
                                 params: Optional[Dict] = None) -> Dict[str, Any]:
         """Make authenticated request to Zoho Books API"""
         if not self.is_configured:
-            logger.warning(f"Zoho Books API call ({method} {endpoint}) - running in stub mode")
+            logger.warning("Zoho Books API call (%s %s) - running in stub mode", method, endpoint)
             return {"message": "stub_response", "code": 0}
         
         # Ensure organization_id is in params
@@ -164,39 +420,29 @@ class ZohoBooksConnector:
         params["organization_id"] = self.organization_id
         
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        headers = self.get_auth_headers()
         
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.request(
-                    method=method,
-                    url=url,
-                    json=data,
-                    params=params,
-                    headers=headers
-                )
-                
-                if response.status_code == 401:  # Token expired
-                    logger.info("Access token expired, attempting refresh")
-                    if await self.refresh_access_token():
-                        # Retry with new token
-                        headers = self.get_auth_headers()
-                        response = await client.request(
-                            method=method,
-                            url=url,
-                            json=data,
-                            params=params,
-                            headers=headers
-                        )
+            if self._token_expiring():
+                await self.refresh_access_token()
+            headers = self.get_auth_headers()
+            headers["Content-Type"] = "application/json"
+            # A 401 is refreshed and retried by _ZohoAuthRefreshTransport
+            response = await self._get_client().request(
+                method=method,
+                url=url,
+                content=_encode_json_body(data),
+                params=params,
+                headers=headers
+            )
+            
+            if response.status_code == 200:
+                return _decode_json_response(response)
+            else:
+                logger.error("Zoho API error: %s - %s", response.status_code, response.text)
+                return {"error": f"API call failed: {response.status_code}"}
                 
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"Zoho API error: {response.status_code} - {response.text}")
-                    return {"error": f"API call failed: {response.status_code}"}
-                    
         except Exception as e:
-            logger.error(f"Zoho Books API request failed: {e}")
+            logger.error("Zoho Books API request failed: %s", e)
             return {"error": str(e)}
     
     async def create_invoice(self, invoice_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -227,13 +473,37 @@ class ZohoBooksConnector:
             zoho_invoice["line_items"].append(zoho_item)
         
         result = await self._make_zoho_request("POST", "invoices", data=zoho_invoice)
-        logger.info(f"Created invoice in Zoho Books: {result.get('invoice', {}).get('invoice_id', 'Unknown')}")
+        logger.info("Created invoice in Zoho Books: %s", result.get('invoice', {}).get('invoice_id', 'Unknown'))
         return result
     
+    async def create_invoices_bulk(self, invoices: List[Dict[str, Any]],
+                                   concurrency: int = ZOHO_BULK_CONCURRENCY) -> List[Dict[str, Any]]:
+        """Create many invoices concurrently; results are in input order"""
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def create_one(invoice_data: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.create_invoice(invoice_data)
+        
+        # One failed invoice must not sink the rest of the batch
+        results = await asyncio.gather(*(create_one(inv) for inv in invoices), return_exceptions=True)
+        
+        failed = 0
+        for index, result in enumerate(results):
+            if isinstance(result, Exception):
+                results[index] = {"error": str(result)}
+            if "error" in results[index]:
+                failed += 1
+                logger.warning("Bulk invoice %s failed: %s", invoices[index].get("invoice_number", index),
+                               results[index]["error"])
+        
+        logger.info("Bulk created %s of %s invoices in Zoho Books", len(invoices) - failed, len(invoices))
+        return results
+    
     async def get_transactions(self, account_id: str, from_date: str = "", to_date: str = "") -> List[Dict[str, Any]]:
         """Fetch transactions from Zoho Books"""
         if not self.is_configured:
-            logger.info(f"Fetching transactions for account {account_id} (stub mode)")
+            logger.info("Fetching transactions for account %s (stub mode)", account_id)
             return []
         
         params = {}
@@ -244,7 +514,7 @@ class ZohoBooksConnector:
         
         result = await self._make_zoho_request("GET", f"banktransactions", params=params)
         transactions = result.get("banktransactions", [])
-        logger.info(f"Fetched {len(transactions)} transactions from Zoho Books")
+        logger.info("Fetched %s transactions from Zoho Books", len(transactions))
         return transactions
     
     async def get_organizations(self) -> List[Dict[str, Any]]:
@@ -270,11 +540,11 @@ class ZohoBooksConnector:
         }
         
         result = await self._make_zoho_request("POST", "contacts", data=zoho_contact)
-        logger.info(f"Created contact in Zoho Books: {result.get('contact', {}).get('contact_id', 'Unknown')}")
+        logger.info("Created contact in Zoho Books: %s", result.get('contact', {}).get('contact_id', 'Unknown'))
         return result
 
 
-class EmiratesNBDConnector:
+class EmiratesNBDConnector(_PooledClientMixin):
     """Production Emirates NBD API Souq client for UAE banking integration"""
     
     def __init__(self, api_key: str = "", client_id: str = "", account_number: str = "", base_url: str = ""):
@@ -283,6 +553,10 @@ class EmiratesNBDConnector:
         self.account_number = account_number or settings.emirates_nbd_account_number or ""
         self.base_url = base_url or settings.emirates_nbd_base_url
         
+        # (endpoint, account_number) -> (monotonic fetch time, response)
+        self._read_cache: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+        self._read_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        
         # Check if we have credentials for production use
         self.is_configured = bool(self.api_key and self.client_id and self.account_number)
         
@@ -306,38 +580,62 @@ class EmiratesNBDConnector:
                                params: Optional[Dict] = None) -> Dict[str, Any]:
         """Make authenticated request to Emirates NBD API Souq"""
         if not self.is_configured:
-            logger.warning(f"Emirates NBD API call ({method} {endpoint}) - running in stub mode")
+            logger.warning("Emirates NBD API call (%s %s) - running in stub mode", method, endpoint)
             return {"message": "stub_response", "status": "success"}
         
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
         headers = self.get_auth_headers()
         
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.request(
-                    method=method,
-                    url=url,
-                    json=data,
-                    params=params,
-                    headers=headers
-                )
+            response = await self._get_client().request(
+                method=method,
+                url=url,
+                content=_encode_json_body(data),
+                params=params,
+                headers=headers
+            )
+            
+            if response.status_code == 200:
+                return _decode_json_response(response)
+            else:
+                logger.error("Emirates NBD API error: %s - %s", response.status_code, response.text)
+                return {"error": f"API call failed: {response.status_code}"}
                 
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"Emirates NBD API error: {response.status_code} - {response.text}")
-                    return {"error": f"API call failed: {response.status_code}"}
-                    
         except Exception as e:
-            logger.error(f"Emirates NBD API request failed: {e}")
+            logger.error("Emirates NBD API request failed: %s", e)
             return {"error": str(e)}
     
+    async def _cached_read(self, endpoint: str, account: str, ttl: float) -> Dict[str, Any]:
+        """GET an account endpoint, collapsing calls within ttl into one request"""
+        key = (endpoint, account)
+        cached = self._read_cache.get(key)
+        if cached and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+        
+        lock = self._read_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # A concurrent caller may have filled the cache while we waited
+            cached = self._read_cache.get(key)
+            if cached and time.monotonic() - cached[0] < ttl:
+                return cached[1]
+            
+            result = await self._make_emirates_nbd_request("GET", endpoint, params={"account_number": account})
+            if "error" not in result:
+                self._read_cache[key] = (time.monotonic(), result)
+            return result
+    
+    def invalidate_account_cache(self, account_number: str = "") -> None:
+        """Drop cached balance/details so the next read hits the bank"""
+        account = account_number or self.account_number
+        for endpoint in ("accounts/balance", "accounts/details"):
+            self._read_cache.pop((endpoint, account), None)
+    
     async def fetch_transactions(self, account_number: str = "", days: int = 1) -> List[Dict[str, Any]]:
         """Fetch recent transactions from Emirates NBD"""
         account = account_number or self.account_number
         
         if not self.is_configured:
-            logger.info(f"Fetching {days} days of transactions for Emirates NBD account {account} (stub mode)")
+            logger.info("Fetching %s days of transactions for Emirates NBD account %s (stub mode)", days, account)
             # Return realistic UAE banking stub data
             return [
                 {
@@ -364,21 +662,56 @@ class EmiratesNBDConnector:
                 }
             ]
         
-        # Calculate date range
-        from datetime import timedelta
-        end_date = datetime.now()
+        end_date = date.today()
         start_date = end_date - timedelta(days=days)
+        return await self.fetch_transactions_range(start_date, end_date, account)
+    
+    async def fetch_transactions_range(self, start: date, end: date, account_number: str = "",
+                                       window_days: int = ENBD_TRANSACTION_WINDOW_DAYS) -> List[Dict[str, Any]]:
+        """Fetch transactions between two dates (inclusive) as concurrent date windows"""
+        account = account_number or self.account_number
         
-        params = {
-            "account_number": account,
-            "from_date": start_date.strftime("%Y-%m-%d"),
-            "to_date": end_date.strftime("%Y-%m-%d"),
-            "limit": 100
-        }
+        if not self.is_configured:
+            return await self.fetch_transactions(account, days=(end - start).days)
+        
+        # Non-overlapping inclusive windows, so no transaction is fetched twice
+        step = timedelta(days=window_days)
+        windows = []
+        window_start = start
+        while window_start <= end:
+            window_end = min(window_start + step - timedelta(days=1), end)
+            windows.append((window_start, window_end))
+            window_start = window_end + timedelta(days=1)
         
-        result = await self._make_emirates_nbd_request("GET", "accounts/transactions", params=params)
-        transactions = result.get("transactions", [])
-        logger.info(f"Fetched {len(transactions)} transactions from Emirates NBD")
+        semaphore = asyncio.Semaphore(ENBD_MAX_CONCURRENT_WINDOWS)
+        
+        async def fetch_window(window_start: date, window_end: date) -> List[Dict[str, Any]]:
+            params = {
+                "account_number": account,
+                "from_date": window_start.strftime("%Y-%m-%d"),
+                "to_date": window_end.strftime("%Y-%m-%d"),
+                "limit": ENBD_TRANSACTION_PAGE_LIMIT
+            }
+            async with semaphore:
+                result = await self._make_emirates_nbd_request("GET", "accounts/transactions", params=params)
+            transactions = result.get("transactions", [])
+            if len(transactions) < ENBD_TRANSACTION_PAGE_LIMIT:
+                return transactions
+            if window_start == window_end:
+                logger.warning("Emirates NBD returned a full page for %s; transactions beyond %s may be missing",
+                               window_start, ENBD_TRANSACTION_PAGE_LIMIT)
+                return transactions
+            # The page filled up, so the window may hold more; fetch its halves instead
+            middle = window_start + (window_end - window_start) // 2
+            first, second = await asyncio.gather(
+                fetch_window(window_start, middle),
+                fetch_window(middle + timedelta(days=1), window_end)
+            )
+            return first + second
+        
+        results = await asyncio.gather(*(fetch_window(a, b) for a, b in windows))
+        transactions = list(chain.from_iterable(results))
+        logger.info("Fetched %s transactions from Emirates NBD in %s windows", len(transactions), len(windows))
         return transactions
     
     async def get_balance(self, account_number: str = "") -> Dict[str, Any]:
@@ -386,7 +719,7 @@ class EmiratesNBDConnector:
         account = account_number or self.account_number
         
         if not self.is_configured:
-            logger.info(f"Getting balance for Emirates NBD account {account} (stub mode)")
+            logger.info("Getting balance for Emirates NBD account %s (stub mode)", account)
             return {
                 "account_number": account,
                 "balance": 15750.25,
@@ -397,9 +730,8 @@ class EmiratesNBDConnector:
                 "bank": "Emirates NBD"
             }
         
-        params = {"account_number": account}
-        result = await self._make_emirates_nbd_request("GET", "accounts/balance", params=params)
-        logger.info(f"Retrieved balance for Emirates NBD account {account}")
+        result = await self._cached_read("accounts/balance", account, ENBD_BALANCE_CACHE_TTL_SECONDS)
+        logger.info("Retrieved balance for Emirates NBD account %s", account)
         return result
     
     async def get_account_details(self, account_number: str = "") -> Dict[str, Any]:
@@ -407,7 +739,7 @@ class EmiratesNBDConnector:
         account = account_number or self.account_number
         
         if not self.is_configured:
-            logger.info(f"Getting Emirates NBD account details for {account} (stub mode)")
+            logger.info("Getting Emirates NBD account details for %s (stub mode)", account)
             return {
                 "account_number": account,
                 "account_name": "Business Current Account",
@@ -419,15 +751,39 @@ class EmiratesNBDConnector:
                 "mode": "stub"
             }
         
-        params = {"account_number": account}
-        result = await self._make_emirates_nbd_request("GET", "accounts/details", params=params)
-        logger.info(f"Retrieved Emirates NBD account details for {account}")
+        result = await self._cached_read("accounts/details", account, ENBD_DETAILS_CACHE_TTL_SECONDS)
+        logger.info("Retrieved Emirates NBD account details for %s", account)
         return result
 
 
 class BankFileImporter:
     """Bank statement file importer for banks that don't have APIs"""
     
+    # Parsers for non-CSV formats (ofxparse, and openpyxl/pandas once Excel
+    # lands) are loaded with _lazy_import inside their _iter_*/_import_*
+    # methods, never at module level, so worker start-up stays cheap
+    
+    # Common CSV column mappings for UAE banks (candidates are lower-case)
+    COLUMN_MAPPINGS = {
+        "date": ("date", "transaction_date", "value_date", "posting_date"),
+        "description": ("description", "narrative", "details", "particulars"),
+        "amount": ("amount", "transaction_amount", "debit", "credit"),
+        "balance": ("balance", "running_balance", "available_balance"),
+        "reference": ("reference", "ref", "transaction_ref", "cheque_no")
+    }
+    
+    # Currency code, thousands separators and spaces stripped before float()
+    _CURRENCY_RE = re.compile(r"AED", re.IGNORECASE)
+    _AMOUNT_TRANS = str.maketrans("", "", ", ")
+    
+    # Row cap for import_statement, which materialises the whole statement;
+    # stream() has no cap since it only holds one batch at a time
+    MAX_IMPORT_ROWS = 1000
+    STREAM_BATCH_SIZE = 500
+    
+    # Detected CSV dialect per bank; each bank exports one known format
+    _dialect_cache: Dict[str, type] = {}
+    
     def __init__(self):
         self.supported_formats = [".csv", ".xlsx", ".qif", ".ofx"]
         logger.info("Bank file importer initialized - supports CSV, Excel, QIF, OFX formats")
@@ -436,13 +792,13 @@ class BankFileImporter:
         """Import transactions from bank statement file"""
         
         if not file_path.exists():
-            logger.error(f"Bank statement file not found: {file_path}")
+            logger.error("Bank statement file not found: %s", file_path)
             return []
         
         file_ext = file_path.suffix.lower()
         
         if file_ext not in self.supported_formats:
-            logger.error(f"Unsupported file format: {file_ext}")
+            logger.error("Unsupported file format: %s", file_ext)
             return []
         
         try:
@@ -450,80 +806,173 @@ class BankFileImporter:
                 return await self._import_csv(file_path, bank_name)
             elif file_ext in [".xlsx", ".xls"]:
                 return await self._import_excel(file_path, bank_name)
+            elif file_ext == ".ofx" and _lazy_import("ofxparse") is not None:
+                return await asyncio.to_thread(lambda: list(self._iter_ofx(file_path, bank_name)))
             else:
-                logger.warning(f"Format {file_ext} support coming soon")
+                logger.warning("Format %s support coming soon", file_ext)
                 return []
                 
         except Exception as e:
-            logger.error(f"Failed to import bank statement: {e}")
+            logger.error("Failed to import bank statement: %s", e)
             return []
     
-    async def _import_csv(self, file_path: Path, bank_name: str) -> List[Dict[str, Any]]:
-        """Import CSV bank statement (common format for UAE banks)"""
-        import csv
+    async def import_statements(self, files: List[Tuple[Path, str]]) -> List[List[Dict[str, Any]]]:
+        """Import several (file_path, bank_name) statements concurrently"""
+        return await asyncio.gather(*(self.import_statement(path, bank) for path, bank in files))
+    
+    async def stream(self, file_path: Path, bank_name: str = "Unknown") -> AsyncIterator[Dict[str, Any]]:
+        """Yield transactions from a CSV or OFX statement without loading it all into memory"""
+        
+        if not file_path.exists():
+            logger.error("Bank statement file not found: %s", file_path)
+            return
         
-        transactions = []
+        file_ext = file_path.suffix.lower()
         
-        # Common CSV column mappings for UAE banks
-        column_mappings = {
-            "date": ["date", "transaction_date", "value_date", "posting_date"],
-            "description": ["description", "narrative", "details", "particulars"],
-            "amount": ["amount", "transaction_amount", "debit", "credit"],
-            "balance": ["balance", "running_balance", "available_balance"],
-            "reference": ["reference", "ref", "transaction_ref", "cheque_no"]
-        }
+        if file_ext == ".csv":
+            rows = self._iter_csv(file_path, bank_name)
+        elif file_ext == ".ofx":
+            if _lazy_import("ofxparse") is None:
+                logger.warning("ofxparse not installed - cannot stream %s", file_path)
+                return
+            rows = self._iter_ofx(file_path, bank_name)
+        else:
+            logger.error("Streaming not supported for format: %s", file_ext)
+            return
         
+        # Pull rows off the file in batches on a worker thread so the event
+        # loop never blocks on disk reads and memory stays at one batch
+        try:
+            while True:
+                batch = await asyncio.to_thread(list, islice(rows, self.STREAM_BATCH_SIZE))
+                if not batch:
+                    break
+                for transaction in batch:
+                    yield transaction
+        except Exception as e:
+            logger.error("Failed to stream bank statement: %s", e)
+        finally:
+            rows.close()
+    
+    async def _import_csv(self, file_path: Path, bank_name: str) -> List[Dict[str, Any]]:
+        """Import CSV bank statement off the event loop"""
+        return await asyncio.to_thread(self._import_csv_sync, file_path, bank_name)
+    
+    def _import_csv_sync(self, file_path: Path, bank_name: str) -> List[Dict[str, Any]]:
+        """Import CSV bank statement (common format for UAE banks)"""
+        transactions = list(self._iter_csv(file_path, bank_name, max_rows=self.MAX_IMPORT_ROWS))
+        logger.info("Imported %s transactions from %s CSV file", len(transactions), bank_name)
+        return transactions
+    
+    def _iter_csv(self, file_path: Path, bank_name: str, max_rows: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Lazily parse CSV rows into standard transaction dicts"""
         with open(file_path, 'r', encoding='utf-8') as file:
-            # Try to detect CSV dialect
-            sample = file.read(1024)
-            file.seek(0)
-            sniffer = csv.Sniffer()
-            delimiter = sniffer.sniff(sample).delimiter
+            dialect = self._dialect_cache.get(bank_name)
+            if dialect is None:
+                dialect = self._sniff_dialect(file, bank_name)
             
-            reader = csv.DictReader(file, delimiter=delimiter)
+            reader = csv.DictReader(file, delimiter=dialect.delimiter)
+            
+            # Resolve which header feeds each field once per file, not per row
+            columns = self._resolve_columns(reader.fieldnames or [])
+            date_col = columns["date"]
+            description_col = columns["description"]
+            amount_col = columns["amount"]
+            balance_col = columns["balance"]
+            reference_col = columns["reference"]
             
             for row_num, row in enumerate(reader, 1):
-                if row_num > 1000:  # Limit to 1000 transactions for safety
+                if max_rows is not None and row_num > max_rows:
                     break
                 
                 try:
+                    raw_amount = self._cell(row, amount_col)
+                    
                     # Map columns to standard format
                     transaction = {
                         "transaction_id": f"{bank_name}-CSV-{row_num:04d}",
-                        "date": self._extract_field(row, column_mappings["date"]),
-                        "description": self._extract_field(row, column_mappings["description"]),
-                        "amount": self._parse_amount(self._extract_field(row, column_mappings["amount"])),
-                        "balance": self._parse_amount(self._extract_field(row, column_mappings["balance"])),
-                        "reference": self._extract_field(row, column_mappings["reference"]),
+                        "date": self._cell(row, date_col),
+                        "description": self._cell(row, description_col),
+                        "amount": self._parse_amount(raw_amount),
+                        "balance": self._parse_amount(self._cell(row, balance_col)),
+                        "reference": self._cell(row, reference_col),
                         "currency": "AED",
-                        "type": "debit" if str(self._extract_field(row, column_mappings["amount"])).startswith("-") else "credit",
+                        "type": "debit" if raw_amount.startswith("-") else "credit",
                         "bank": bank_name,
                         "source": "csv_import"
                     }
                     
                     if transaction["date"] and transaction["amount"] is not None:
-                        transactions.append(transaction)
+                        yield transaction
                         
                 except Exception as e:
-                    logger.warning(f"Skipped row {row_num} due to parsing error: {e}")
+                    logger.warning("Skipped row %s due to parsing error: %s", row_num, e)
                     continue
-        
-        logger.info(f"Imported {len(transactions)} transactions from {bank_name} CSV file")
-        return transactions
+    
+    def _sniff_dialect(self, file, bank_name: str) -> type:
+        """Detect the CSV dialect from the first 1 KB and remember it for the bank"""
+        sample = file.read(1024)
+        file.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample)
+        except csv.Error:
+            logger.warning("Could not detect CSV dialect for %s, assuming comma-separated", bank_name)
+            return csv.excel
+        
+        # "Unknown" covers many formats, so only named banks are cached
+        if bank_name != "Unknown":
+            self._dialect_cache[bank_name] = dialect
+        return dialect
+    
+    def _iter_ofx(self, file_path: Path, bank_name: str) -> Iterator[Dict[str, Any]]:
+        """Yield OFX statement transactions one at a time"""
+        ofxparse = _lazy_import("ofxparse")
+        with open(file_path, 'rb') as file:
+            ofx = ofxparse.OfxParser.parse(file)
+        
+        for account in ofx.accounts:
+            statement = account.statement
+            currency = (getattr(statement, "currency", None) or "AED").upper()
+            
+            for txn in statement.transactions:
+                amount = float(txn.amount)
+                yield {
+                    "transaction_id": f"{bank_name}-OFX-{txn.id}",
+                    "date": txn.date.date().isoformat() if txn.date else "",
+                    "description": txn.memo or txn.payee or "",
+                    "amount": amount,
+                    "balance": None,
+                    "reference": txn.checknum or "",
+                    "currency": currency,
+                    "type": "debit" if amount < 0 else "credit",
+                    "bank": bank_name,
+                    "source": "ofx_import"
+                }
     
     async def _import_excel(self, file_path: Path, bank_name: str) -> List[Dict[str, Any]]:
         """Import Excel bank statement"""
         # Would implement Excel parsing here
-        logger.info(f"Excel import for {bank_name} - feature coming soon")
+        logger.info("Excel import for %s - feature coming soon", bank_name)
         return []
     
-    def _extract_field(self, row: Dict, possible_columns: List[str]) -> str:
-        """Extract field value from row using possible column names"""
-        for col in possible_columns:
-            for key, value in row.items():
-                if col.lower() in key.lower():
-                    return str(value).strip() if value else ""
-        return ""
+    def _resolve_columns(self, fieldnames: List[str]) -> Dict[str, Optional[str]]:
+        """Map each field to the first header containing one of its candidate names"""
+        lowered = [(header, header.casefold()) for header in fieldnames]
+        return {
+            field_name: next(
+                (header for col in candidates for header, low in lowered if col in low),
+                None
+            )
+            for field_name, candidates in self.COLUMN_MAPPINGS.items()
+        }
+    
+    @staticmethod
+    def _cell(row: Dict, column: Optional[str]) -> str:
+        """Stripped cell value for a resolved column, or "" if absent"""
+        if column is None:
+            return ""
+        value = row.get(column)
+        return str(value).strip() if value else ""
     
     def _parse_amount(self, amount_str: str) -> Optional[float]:
         """Parse amount string to float"""
@@ -532,8 +981,8 @@ class BankFileImporter:
         
         try:
             # Remove common currency symbols and commas
-            cleaned = amount_str.replace("AED", "").replace(",", "").replace(" ", "").strip()
-            return float(cleaned)
+            cleaned = self._CURRENCY_RE.sub("", amount_str).translate(self._AMOUNT_TRANS).strip()
+            return float(cleaned) if cleaned else None
         except ValueError:
             return None
 
@@ -543,5 +992,6 @@ zoho_books = ZohoBooksConnector()
 emirates_nbd = EmiratesNBDConnector()
 bank_file_importer = BankFileImporter()
 
+
 # Legacy alias for compatibility (now points to Emirates NBD)
 wio_bank = emirates_nbd  # For backward compatibility with existing code
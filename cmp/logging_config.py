@@ -1,44 +1,80 @@
 import logging
+import logging.handlers
+import queue
 import sys
 from pathlib import Path
+from typing import Optional
 
 from .config import settings
 
+# Background thread that owns the real (blocking) handlers, and the root
+# handler that feeds it
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
 
 def setup_logging() -> None:
     """Configure logging for the CMP application"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
     
     # Create logs directory if it doesn't exist
     logs_dir = Path("logs")
     logs_dir.mkdir(exist_ok=True)
     
-    # Configure root logger
-    logging.basicConfig(
-        level=logging.INFO if settings.env == "production" else logging.DEBUG,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            # Console handler
-            logging.StreamHandler(sys.stdout),
-            # File handler
-            logging.FileHandler(logs_dir / "cmp.log"),
-        ]
-    )
-    
-    # Set specific logger levels
-    logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
-    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    handlers = [
+        # Console handler
+        logging.StreamHandler(sys.stdout),
+        # File handler
+        logging.FileHandler(logs_dir / "cmp.log"),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
     
     # Create AI agent loggers
     for agent in ["accountant", "controller", "director", "cfo"]:
-        agent_logger = logging.getLogger(f"cmp.agents.{agent}")
-        agent_logger.setLevel(logging.INFO)
+        agent_name = f"cmp.agents.{agent}"
+        logging.getLogger(agent_name).setLevel(logging.INFO)
         
-        # Add agent-specific file handler
+        # Agent-specific file, fed only with that agent's records
         agent_handler = logging.FileHandler(logs_dir / f"agent_{agent}.log")
         agent_handler.setFormatter(
             logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
         )
-        agent_logger.addHandler(agent_handler)
+        agent_handler.addFilter(logging.Filter(agent_name))
+        handlers.append(agent_handler)
+    
+    # Request paths only enqueue records; file and console I/O happen on the listener thread
+    log_queue: queue.Queue = queue.Queue(-1)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    
+    # Queued records carry the bare message; the listener's handlers add the layout
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    _queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    
+    # Configure root logger. Added directly rather than via basicConfig, which
+    # does nothing once the host (uvicorn, pytest) has given root a handler
+    root = logging.getLogger()
+    root.setLevel(logging.INFO if settings.env == "production" else logging.DEBUG)
+    root.addHandler(_queue_handler)
+    
+    # Set specific logger levels
+    logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the background listener"""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .auth import check_bcrypt_rounds, flush_pending_logins, prime_dummy_password_hash, run_login_flusher
 from .db import init_db
+from .integrations.invoices import zoho_books, emirates_nbd, bank_file_importer
 from .routers import health, dashboard, auth
-from .logging_config import setup_logging, get_logger
+from .logging_config import setup_logging, shutdown_logging, get_logger
+from .utils.sha256 import describe_backend
 
 logger = get_logger("main")
 
@@ -34,8 +40,30 @@ def create_app() -> FastAPI:
     def _startup():
         setup_logging()
         logger.info("CMP application starting up...")
+        check_bcrypt_rounds()
+        prime_dummy_password_hash()
         init_db()
         logger.info("Database initialized successfully")
+        logger.info(describe_backend())
+
+    @app.on_event("startup")
+    async def _start_background_tasks():
+        # Shared connectors (and their pooled HTTP clients) are owned by the app
+        app.state.zoho_books = zoho_books
+        app.state.emirates_nbd = emirates_nbd
+        app.state.bank_file_importer = bank_file_importer
+        app.state.login_flusher = asyncio.create_task(run_login_flusher())
+
+    @app.on_event("shutdown")
+    async def _shutdown():
+        app.state.login_flusher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await app.state.login_flusher
+        flush_pending_logins()
+        await app.state.zoho_books.aclose()
+        await app.state.emirates_nbd.aclose()
+        logger.info("CMP application shut down")
+        shutdown_logging()
 
     return app
 
@@ -1,15 +1,27 @@
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
 import json
-import hashlib
-from typing import Any, Optional
+import math
+import re
+import threading
+from typing import Any, Iterable, Optional
 from enum import Enum as PyEnum
+from json.encoder import encode_basestring_ascii
 
-from sqlalchemy import Integer, String, DateTime, JSON, Boolean, Enum
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, String, DateTime, JSON, Boolean, Enum, Index, event, select
+from sqlalchemy.orm import Mapped, Session, mapped_column
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from .config import settings
 from .db import Base
+from .utils.sha256 import sha256_fast
 
 
 # Use SQLAlchemy's generic JSON type which maps to the appropriate backend type
@@ -23,6 +35,14 @@ class UserRole(PyEnum):
     VIEWER = "viewer"         # Read-only access to dashboards and reports
 
 
+# Permission level per role; a user may act on anything at or below their level
+_ROLE_LEVEL = {
+    UserRole.VIEWER: 1,
+    UserRole.ORCHESTRATOR: 2,
+    UserRole.ADMIN: 3
+}
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -40,16 +60,20 @@ class User(Base):
 
     def has_permission(self, required_role: UserRole) -> bool:
         """Check if user has required permission level"""
-        role_hierarchy = {
-            UserRole.VIEWER: 1,
-            UserRole.ORCHESTRATOR: 2,
-            UserRole.ADMIN: 3
-        }
-        return role_hierarchy[self.role] >= role_hierarchy[required_role]
+        return _ROLE_LEVEL[self.role] >= _ROLE_LEVEL[required_role]
 
 
 class LedgerEntry(Base):
     __tablename__ = "ledger_entries"
+    __table_args__ = (
+        # Newest-first reads (chain tail, recent activity) become index-only:
+        # (id, hash) covers the tail lookup everywhere, and Postgres also
+        # carries the columns the dashboard lists
+        Index(
+            "ix_ledger_recent", "id", "hash",
+            postgresql_include=["timestamp", "actor", "action"],
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     timestamp: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), default=lambda: dt.datetime.now(dt.timezone.utc), nullable=False)
@@ -64,27 +88,204 @@ class LedgerEntry(Base):
         return f"<LedgerEntry id={self.id} actor={self.actor} action={self.action}>"
 
 
-def canonicalize_payload(payload: Optional[dict[str, Any]]) -> str:
+# orjson output matches json.dumps(sort_keys=True, separators=(",", ":")) byte
+# for byte except for non-ASCII / DEL characters (json escapes them), floats
+# in exponent form or below 1e-4 (formatted differently), and NaN (orjson
+# writes null). Those payloads take the json path so existing hashes verify.
+_ORJSON_DIVERGENT_RE = re.compile(rb"[^\x00-\x7e]|\de-?\d|0\.0000|null")
+
+
+def _json_canonical(payload: dict[str, Any]) -> bytes:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+
+
+_JSON_LITERALS = {True: "true", False: "false", None: "null"}
+
+
+def _flat_canonical(payload: dict[str, Any]) -> Optional[bytes]:
+    """json.dumps-identical bytes for a flat dict of scalars, or None if not flat"""
+    try:
+        keys = sorted(payload)
+    except TypeError:  # mixed key types
+        return None
+    parts = []
+    for key in keys:
+        value = payload[key]
+        kind = type(value)
+        if type(key) is not str:
+            return None
+        if kind is str:
+            encoded = encode_basestring_ascii(value)
+        elif kind is int:
+            encoded = int.__repr__(value)
+        elif kind is float and math.isfinite(value):
+            encoded = float.__repr__(value)
+        elif value is None or kind is bool:
+            encoded = _JSON_LITERALS[value]
+        else:
+            return None
+        parts.append(f"{encode_basestring_ascii(key)}:{encoded}")
+    return f"{{{','.join(parts)}}}".encode()
+
+
+def canonicalize_payload(payload: Optional[dict[str, Any]]) -> bytes:
     if payload is None:
-        return "null"
+        return b"null"
     # Stable order
-    return json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    if ORJSON_AVAILABLE:
+        try:
+            canonical = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        except TypeError:  # non-str keys, ints beyond 64 bits
+            canonical = None
+        if canonical is not None and _ORJSON_DIVERGENT_RE.search(canonical) is None:
+            return canonical
+    # Flat {str: scalar} payloads (manual entries, or ones with None / non-ASCII
+    # values that orjson can't take) skip json's generic encoder
+    return _flat_canonical(payload) or _json_canonical(payload)
 
 
 def compute_ledger_hash(prev_hash: str, timestamp: dt.datetime, actor: str, action: str, payload: Optional[dict[str, Any]]) -> str:
-    canonical = canonicalize_payload(payload)
-    raw = f"{prev_hash}|{timestamp.isoformat()}|{actor}|{action}|{canonical}".encode()
-    return hashlib.sha256(raw).hexdigest()
+    # Chain audits matching entry.hash against this must use hmac.compare_digest,
+    # not ==, so a forged hash can't be built up from comparison timings
+    # Entries are stamped in UTC, but SQLite hands them back naive; restore the
+    # offset so a reloaded entry serializes exactly as it did when appended
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=dt.timezone.utc)
+    raw = b"|".join((
+        prev_hash.encode(),
+        timestamp.isoformat().encode(),
+        actor.encode(),
+        action.encode(),
+        canonicalize_payload(payload),
+    ))
+    return sha256_fast(raw)
+
+
+# Hash of the last committed ledger entry, seeded from the DB on first use.
+# A session's uncommitted tail lives in session.info and is only promoted
+# here on commit, so rolled-back or abandoned appends never leak into it.
+# A None tail in session.info means "unknown, re-read inside the session".
+_last_hash: Optional[str] = None
+_last_hash_lock = threading.Lock()
+_SESSION_TAIL_KEY = "ledger_tail"
+
+# One appending transaction at a time: a session takes the writer lock when it
+# first reads the tail and keeps it until its outer transaction commits, rolls
+# back or is closed, so no two commits can chain onto the same prev_hash. A
+# plain Lock because FastAPI may commit on a different thread than it appended
+_ledger_writer_lock = threading.Lock()
+_SESSION_WRITER_KEY = "ledger_writer"
+
+
+class LedgerBusyError(RuntimeError):
+    """Raised when another open transaction holds the ledger writer lock too long"""
+    pass
+
+# Bumped whenever a transaction that inserted ledger entries commits, so
+# readers can cache ledger-derived views until the ledger changes
+_ledger_version = 0
+_SESSION_WROTE_KEY = "ledger_written"
+
+
+def ledger_version() -> int:
+    """Counter that changes whenever this process commits new ledger entries"""
+    return _ledger_version
+
+
+def _select_tail_hash(session) -> str:
+    last = session.scalar(select(LedgerEntry.hash).order_by(LedgerEntry.id.desc()).limit(1))
+    return last if last is not None else "GENESIS"
+
+
+def _acquire_ledger_writer(session) -> None:
+    if _SESSION_WRITER_KEY in session.info:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        acquired = _ledger_writer_lock.acquire(timeout=settings.ledger_writer_timeout)
+    else:
+        # Waiting here would stall every request on the event loop, and the
+        # holder may be a coroutine on this same loop
+        acquired = _ledger_writer_lock.acquire(blocking=False)
+    if not acquired:
+        raise LedgerBusyError(
+            "another open transaction is appending to the ledger; commit, roll back "
+            "or close it first (two sessions appending on one thread deadlock)"
+        )
+    session.info[_SESSION_WRITER_KEY] = True
+
+
+def _release_ledger_writer(session) -> None:
+    if session.info.pop(_SESSION_WRITER_KEY, False):
+        _ledger_writer_lock.release()
+
+
+def _tail_hash(session) -> str:
+    global _last_hash
+    _acquire_ledger_writer(session)
+    if _SESSION_TAIL_KEY in session.info:
+        return session.info[_SESSION_TAIL_KEY] or _select_tail_hash(session)
+    with _last_hash_lock:
+        if _last_hash is None or not settings.ledger_tail_cache:
+            _last_hash = _select_tail_hash(session)
+        return _last_hash
+
+
+@event.listens_for(Session, "after_flush")
+def _note_ledger_write(session, flush_context) -> None:
+    if _SESSION_WROTE_KEY not in session.info and any(isinstance(obj, LedgerEntry) for obj in session.new):
+        session.info[_SESSION_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _promote_ledger_tail(session) -> None:
+    global _last_hash, _ledger_version
+    # Releasing a SAVEPOINT also fires after_commit; only the outer commit counts
+    if session.in_nested_transaction():
+        return
+    if session.info.pop(_SESSION_WROTE_KEY, False):
+        with _last_hash_lock:
+            _ledger_version += 1
+    if _SESSION_TAIL_KEY in session.info:
+        tail = session.info.pop(_SESSION_TAIL_KEY)
+        with _last_hash_lock:
+            _last_hash = tail
+    # Only after the new tail is visible may the next writer read it
+    _release_ledger_writer(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_ledger_tail(session) -> None:
+    if not session.in_nested_transaction():
+        session.info.pop(_SESSION_TAIL_KEY, None)
+        _release_ledger_writer(session)
+    elif _SESSION_TAIL_KEY in session.info:
+        # The rolled-back savepoint may have held the tail entry
+        session.info[_SESSION_TAIL_KEY] = None
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _clear_ledger_tail(session, transaction) -> None:
+    # Covers close() without commit, which does not fire after_rollback
+    if transaction.parent is None:
+        session.info.pop(_SESSION_TAIL_KEY, None)
+        session.info.pop(_SESSION_WROTE_KEY, None)
+        _release_ledger_writer(session)
 
 
 def append_ledger_entry(session, *, actor: str, action: str, data: Optional[dict[str, Any]] = None) -> LedgerEntry:
-    # Get previous hash
-    from sqlalchemy import select
+    """Chain a new entry onto the ledger in this session's transaction
 
-    last_hash = "GENESIS"
-    last = session.execute(select(LedgerEntry).order_by(LedgerEntry.id.desc()).limit(1)).scalar_one_or_none()
-    if last is not None:
-        last_hash = last.hash
+    The session holds the ledger writer lock from here until its outer
+    transaction commits, rolls back or closes, so keep that short: call from
+    sync code (a threadpool route or background task, not a coroutine) and
+    finish one appending session before another appends on the same thread.
+    Raises LedgerBusyError instead of waiting past ledger_writer_timeout, or
+    at all on an event loop thread.
+    """
+    # Chain onto this session's own pending entry, else the last committed one
+    last_hash = _tail_hash(session)
 
     now = dt.datetime.now(dt.timezone.utc)
     entry = LedgerEntry(
@@ -97,4 +298,33 @@ def append_ledger_entry(session, *, actor: str, action: str, data: Optional[dict
     )
     session.add(entry)
     session.flush()  # assign id
+    session.info[_SESSION_TAIL_KEY] = entry.hash
     return entry
+
+
+def append_ledger_entries(session, items: Iterable[tuple[str, str, Optional[dict[str, Any]]]]) -> list[LedgerEntry]:
+    """Append (actor, action, data) items as one chained run with a single flush
+
+    Takes the ledger writer lock like append_ledger_entry, with the same rules.
+    """
+    last_hash = _tail_hash(session)
+    now = dt.datetime.now(dt.timezone.utc)
+
+    entries = []
+    for actor, action, data in items:
+        entry_hash = compute_ledger_hash(last_hash, now, actor, action, data)
+        entries.append(LedgerEntry(
+            timestamp=now,
+            actor=actor,
+            action=action,
+            data=data,
+            prev_hash=last_hash,
+            hash=entry_hash,
+        ))
+        last_hash = entry_hash
+
+    if entries:
+        session.add_all(entries)
+        session.flush()  # assign ids in insertion order
+        session.info[_SESSION_TAIL_KEY] = last_hash
+    return entries
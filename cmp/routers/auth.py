@@ -6,14 +6,16 @@ Handles user login, logout, registration, and token management.
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, field_serializer
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import Optional, Dict, Any
+import datetime as dt
 
 from ..db import get_db
 from ..auth import (
-    authenticate_user, create_token_response, get_current_user_from_token,
-    verify_token, create_user, AuthenticationError, AuthorizationError
+    authenticate_user_async, create_token_response, get_current_user_from_token,
+    verify_token, create_user, invalidate_user, AuthenticationError, AuthorizationError
 )
 from ..models import User, UserRole
 from ..logging_config import get_logger
@@ -50,16 +52,23 @@ class RefreshTokenRequest(BaseModel):
 
 
 class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)
+
     id: int
     email: str
     full_name: str
-    role: str
+    role: UserRole
     is_active: bool
-    created_at: str
-    last_login: Optional[str]
+    created_at: dt.datetime
+    last_login: Optional[dt.datetime]
+
+    @field_serializer("created_at", "last_login")
+    def _isoformat(self, value: Optional[dt.datetime]) -> Optional[str]:
+        return value.isoformat() if value else None
 
-    class Config:
-        from_attributes = True
+
+# Reads User objects and result rows by attribute, no per-call kwargs dict
+_validate_user = UserResponse.model_validate
 
 
 # Dependency to get current user from token
@@ -96,7 +105,7 @@ async def login(
     db: Session = Depends(get_db)
 ):
     """Authenticate user and return JWT tokens"""
-    user = authenticate_user(db, request.email, request.password)
+    user = await authenticate_user_async(db, request.email, request.password)
     
     if not user:
         raise HTTPException(
@@ -112,7 +121,7 @@ async def login(
 
 
 @router.post("/register", response_model=UserResponse)
-async def register(
+def register(
     request: RegisterRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)  # Only admins can create users
@@ -129,15 +138,7 @@ async def register(
         
         logger.info(f"Admin {current_user.email} created user {user.email}")
         
-        return UserResponse(
-            id=user.id,
-            email=user.email,
-            full_name=user.full_name,
-            role=user.role.value,
-            is_active=user.is_active,
-            created_at=user.created_at.isoformat(),
-            last_login=user.last_login.isoformat() if user.last_login else None
-        )
+        return _validate_user(user)
         
     except ValueError as e:
         raise HTTPException(
@@ -153,7 +154,7 @@ async def register(
 
 
 @router.post("/refresh", response_model=TokenResponse)
-async def refresh_token(
+def refresh_token(
     request: RefreshTokenRequest,
     db: Session = Depends(get_db)
 ):
@@ -199,40 +200,27 @@ async def logout(current_user: User = Depends(get_current_user)):
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information"""
-    return UserResponse(
-        id=current_user.id,
-        email=current_user.email,
-        full_name=current_user.full_name,
-        role=current_user.role.value,
-        is_active=current_user.is_active,
-        created_at=current_user.created_at.isoformat(),
-        last_login=current_user.last_login.isoformat() if current_user.last_login else None
-    )
+    return _validate_user(current_user)
 
 
 @router.get("/users", response_model=list[UserResponse])
-async def list_users(
+def list_users(
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
     """List all users (admin only)"""
-    users = db.query(User).all()
-    return [
-        UserResponse(
-            id=user.id,
-            email=user.email,
-            full_name=user.full_name,
-            role=user.role.value,
-            is_active=user.is_active,
-            created_at=user.created_at.isoformat(),
-            last_login=user.last_login.isoformat() if user.last_login else None
-        )
-        for user in users
-    ]
+    # Plain row tuples of the serialized columns; no ORM instances to build
+    rows = db.execute(
+        select(
+            User.id, User.email, User.full_name, User.role,
+            User.is_active, User.created_at, User.last_login
+        ).execution_options(yield_per=500)
+    )
+    return [_validate_user(row) for row in rows]
 
 
 @router.put("/users/{user_id}/deactivate")
-async def deactivate_user(
+def deactivate_user(
     user_id: int,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -254,13 +242,14 @@ async def deactivate_user(
     
     user.is_active = False
     db.commit()
+    invalidate_user(user.id)
     
     logger.info(f"Admin {current_user.email} deactivated user {user.email}")
     return {"message": f"User {user.email} deactivated successfully"}
 
 
 @router.put("/users/{user_id}/activate")
-async def activate_user(
+def activate_user(
     user_id: int,
     current_user: User = Depends(require_admin),
     db: Session = Depends(get_db)
@@ -276,6 +265,7 @@ async def activate_user(
     
     user.is_active = True
     db.commit()
+    invalidate_user(user.id)
     
     logger.info(f"Admin {current_user.email} activated user {user.email}")
     return {"message": f"User {user.email} activated successfully"}
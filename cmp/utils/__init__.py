@@ -1 +1 @@
-__all__ = ["ocr", "api_client"]
+__all__ = ["ocr", "api_client", "sha256"]
@@ -5,7 +5,10 @@ Handles optical character recognition for invoices and receipts using pytesserac
 Includes fallback handling if Tesseract is not installed.
 """
 
+import asyncio
+import copy
 import logging
+import os
 from pathlib import Path
 from typing import Dict, Any, Optional
 import tempfile
@@ -22,12 +25,21 @@ from ..logging_config import get_logger
 
 logger = get_logger("ocr")
 
+# Tesseract is CPU-bound; cap concurrent jobs at the core count
+OCR_MAX_CONCURRENCY = os.cpu_count() or 2
+_ocr_semaphore = asyncio.Semaphore(OCR_MAX_CONCURRENCY)
+
+# Completed results kept per content hash, so re-uploads skip Tesseract
+OCR_RESULT_CACHE_SIZE = 128
+
 
 class OCRProcessor:
     """OCR processor for extracting text from invoice and receipt images"""
     
     def __init__(self):
         self.supported_formats = {".jpg", ".jpeg", ".png", ".tiff", ".bmp", ".pdf"}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
         
         if not TESSERACT_AVAILABLE:
             logger.warning(
@@ -41,6 +53,12 @@ class OCRProcessor:
             logger.warning("OCR requested but Tesseract not available")
             return ""
         
+        # Run off the event loop so OCR doesn't stall other requests
+        async with _ocr_semaphore:
+            return await asyncio.to_thread(self._extract_text_sync, file_path)
+    
+    def _extract_text_sync(self, file_path: Path) -> str:
+        """Blocking Tesseract pass over one image"""
         try:
             # Open and process image
             with Image.open(file_path) as image:
@@ -107,6 +125,36 @@ class OCRProcessor:
         logger.info(f"Extracted invoice data from {file_path.name}: {invoice_data['invoice_number']} (confidence: {confidence:.2f})")
         return invoice_data
     
+    async def extract_invoice_data_once(self, file_path: Path, content_key: str) -> Dict[str, Any]:
+        """extract_invoice_data, shared by every caller with the same content_key (e.g. sha256)
+
+        Concurrent calls for one key wait on a single OCR run, and successful
+        results are remembered for the next OCR_RESULT_CACHE_SIZE keys. Each
+        caller gets its own copy, so edits to one result never reach another.
+        """
+        cached = self._results.get(content_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
+        future = self._inflight.get(content_key)
+        if future is None:
+            future = asyncio.ensure_future(self.extract_invoice_data(file_path))
+            self._inflight[content_key] = future
+            future.add_done_callback(lambda done: self._finish_ocr(content_key, done))
+        # One waiter being cancelled must not cancel the shared run
+        return copy.deepcopy(await asyncio.shield(future))
+    
+    def _finish_ocr(self, content_key: str, future: asyncio.Future) -> None:
+        self._inflight.pop(content_key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        # Empty text may be a transient failure; let the next upload retry
+        if result["raw_text"]:
+            if len(self._results) >= OCR_RESULT_CACHE_SIZE:
+                self._results.pop(next(iter(self._results)))
+            self._results[content_key] = result
+    
     def _calculate_confidence(self, text: str, invoice_number: Optional[str], 
                             date: Optional[str], vendor: Optional[str], 
                             amount: Optional[float], line_items: list) -> float:
@@ -0,0 +1,42 @@
+"""
+SHA-256 backend selection for the ledger hash chain
+
+CPython's hashlib delegates to OpenSSL, which already dispatches to the
+SHA-NI (x86) / SHA2 (ARMv8) instructions at runtime when the CPU has them.
+This module detects that capability so it can be reported at startup and
+exposes a single `sha256_fast` entry point for hot paths.
+"""
+
+import hashlib
+import platform
+import ssl
+from functools import lru_cache
+
+# /proc/cpuinfo flag names for SHA-256 hardware instructions
+_SHA_CPU_FLAGS = {"sha_ni", "sha2"}
+
+
+@lru_cache(maxsize=1)
+def cpu_has_sha_extensions() -> bool:
+    """True if the CPU advertises SHA-256 instructions (Linux only; False elsewhere)"""
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith(("flags", "Features")):
+                    return not _SHA_CPU_FLAGS.isdisjoint(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return False
+
+
+def sha256_fast(raw: bytes) -> str:
+    """Hex SHA-256 digest of raw bytes"""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def describe_backend() -> str:
+    """One-line description of the SHA-256 backend for the startup log"""
+    return (
+        f"SHA256 hardware acceleration: {str(cpu_has_sha_extensions()).lower()} "
+        f"({ssl.OPENSSL_VERSION}, {platform.machine()})"
+    )
@@ -170,3 +170,73 @@ async def test_reconcile_bank(accountant):
     # Verify enhanced fields
     assert "bank_transactions_count" in result or "error" in result
     assert "currency" in result or "error" in result
+
+
+@pytest.mark.asyncio
+async def test_stream_bank_statement_has_no_row_cap(tmp_path):
+    """Test streaming import yields every row while import_statement stays capped"""
+    from cmp.integrations.invoices import BankFileImporter
+
+    statement = tmp_path / "statement.csv"
+    rows = "".join(f"2024-01-01,Payment {i},-{i}.00,100.00\n" for i in range(1, 1201))
+    statement.write_text("Date,Description,Amount,Balance\n" + rows)
+
+    importer = BankFileImporter()
+    capped = await importer.import_statement(statement, "ENBD")
+    streamed = [txn async for txn in importer.stream(statement, "ENBD")]
+
+    assert len(capped) == importer.MAX_IMPORT_ROWS
+    assert len(streamed) == 1200
+    assert streamed[-1]["transaction_id"] == "ENBD-CSV-1200"
+    assert streamed[-1]["type"] == "debit"
+
+
+@pytest.mark.asyncio
+async def test_emirates_nbd_balance_reads_are_cached():
+    """Test concurrent balance reads within the TTL collapse into one API call"""
+    import asyncio
+    from cmp.integrations.invoices import EmiratesNBDConnector
+
+    connector = EmiratesNBDConnector(api_key="key", client_id="client", account_number="1001")
+    request = AsyncMock(return_value={"balance": 100.0, "currency": "AED"})
+
+    with patch.object(connector, "_make_emirates_nbd_request", request):
+        results = await asyncio.gather(*(connector.get_balance() for _ in range(5)))
+        assert request.await_count == 1
+        assert all(result["balance"] == 100.0 for result in results)
+
+        connector.invalidate_account_cache()
+        await connector.get_balance()
+        assert request.await_count == 2
+
+
+def test_validate_uae_einvoice_reports_schema_errors():
+    """Test e-invoice validation accepts generated invoices and reports bad ones"""
+    from cmp.integrations.invoices import generate_uae_einvoice, validate_uae_einvoice
+
+    assert validate_uae_einvoice(generate_uae_einvoice({"total": 105}))["valid"]
+
+    result = validate_uae_einvoice({"invoice_id": "INV-1", "totals": {"total": "n/a"}})
+    assert not result["valid"]
+    assert "Missing required field: supplier" in result["errors"]
+    assert any(error.startswith("Invalid field totals.total") for error in result["errors"])
+
+
+@pytest.mark.asyncio
+async def test_director_status_copies_nested_values():
+    """Mutating a returned status must not leak into later statuses or the agent"""
+    from cmp.agents.director import AIDirector
+    
+    director = AIDirector()
+    status = await director.get_status()
+    status["payment_limits"]["single_payment"] = 1
+    status["kpi_targets"].clear()
+    status["capabilities"].append("injected")
+    status["ai_features"]["risk_assessment"] = "disabled"
+    
+    fresh = await director.get_status()
+    assert fresh["payment_limits"]["single_payment"] == 10000
+    assert fresh["kpi_targets"]["gross_margin"] == 0.40
+    assert "injected" not in fresh["capabilities"]
+    assert fresh["ai_features"]["risk_assessment"] == "active"
+    assert director.payment_limits["single_payment"] == 10000
@@ -10,8 +10,8 @@ from unittest.mock import patch
 import datetime as dt
 
 from cmp.main import app
-from cmp.db import get_db, Base
-from cmp.models import User, UserRole
+from cmp.db import get_db, Base, SessionLocal
+from cmp.models import LedgerEntry, User, UserRole
 from cmp.auth import hash_password, verify_password, create_access_token, verify_token
 
 # Test database setup
@@ -114,6 +114,17 @@ class TestPasswordHashing:
         assert verify_password(password, hashed) is True
         assert verify_password("wrong", hashed) is False
 
+    def test_production_rejects_low_bcrypt_rounds(self):
+        from cmp.auth import check_bcrypt_rounds
+        from cmp.config import settings
+        
+        with patch.object(settings, "env", "production"), patch.object(settings, "bcrypt_rounds", 8):
+            with pytest.raises(RuntimeError, match="bcrypt_rounds"):
+                check_bcrypt_rounds()
+        
+        with patch.object(settings, "env", "development"), patch.object(settings, "bcrypt_rounds", 8):
+            check_bcrypt_rounds()
+
 
 class TestJWTTokens:
     """Test JWT token creation and verification"""
@@ -133,6 +144,45 @@ class TestJWTTokens:
         assert payload["email"] == "test@example.com"
         assert payload["type"] == "access"
     
+    def test_verify_token_cached_still_checks_type(self):
+        from cmp.auth import AuthenticationError
+        token = create_access_token({"sub": "123"})
+        assert verify_token(token)["sub"] == "123"
+        assert verify_token(token)["sub"] == "123"
+        
+        with pytest.raises(AuthenticationError, match="Invalid token type"):
+            verify_token(token, token_type="refresh")
+    
+    def test_cache_put_evicts_expired_then_oldest(self):
+        from collections import OrderedDict
+        from cmp.auth import _cache_put
+        
+        cache = OrderedDict()
+        _cache_put(cache, 3, "a", 10.0, 1, now=0.0)
+        _cache_put(cache, 3, "b", 10.0, 2, now=0.0)
+        _cache_put(cache, 3, "c", 50.0, 3, now=0.0)
+        _cache_put(cache, 3, "a", 60.0, 4, now=20.0)  # refresh moves "a" to the newest end
+        assert list(cache) == ["b", "c", "a"]
+        
+        _cache_put(cache, 3, "d", 70.0, 5, now=20.0)  # "b" has expired
+        assert list(cache) == ["c", "a", "d"]
+        _cache_put(cache, 3, "e", 80.0, 6, now=20.0)  # all live: drop the oldest
+        assert list(cache) == ["a", "d", "e"]
+    
+    def test_corrupted_signature_rejected(self):
+        import base64
+        from cmp.auth import InvalidTokenError, get_secret_key, verify_hs256
+        token = create_access_token({"sub": "123"})
+        signing_input, signature_b64 = token.rsplit(".", 1)
+        signature = base64.urlsafe_b64decode(signature_b64 + "=" * (-len(signature_b64) % 4))
+        
+        for i in range(len(signature)):
+            corrupted = bytearray(signature)
+            corrupted[i] ^= 0x01
+            forged = signing_input + "." + base64.urlsafe_b64encode(bytes(corrupted)).rstrip(b"=").decode()
+            with pytest.raises(InvalidTokenError, match="Signature verification failed"):
+                verify_hs256(forged, get_secret_key())
+    
     def test_expired_token(self):
         data = {"sub": "123", "email": "test@example.com"}
         expired_delta = dt.timedelta(seconds=-1)  # Already expired
@@ -200,6 +250,29 @@ class TestAuthenticationEndpoints:
         
         assert response.status_code == 401
     
+    def test_login_unknown_user_still_runs_password_check(self, client, admin_user):
+        with patch("cmp.auth.verify_password", wraps=verify_password) as check:
+            response = client.post("/auth/login", json={
+                "email": "nobody@test.com",
+                "password": "password"
+            })
+        
+        assert response.status_code == 401
+        assert check.call_count == 1
+    
+    def test_primed_dummy_hash_keeps_unknown_user_login_to_one_verify(self, client, admin_user):
+        from cmp.auth import prime_dummy_password_hash
+        
+        prime_dummy_password_hash()  # done by app startup
+        with patch("cmp.auth.hash_password", wraps=hash_password) as hasher:
+            response = client.post("/auth/login", json={
+                "email": "nobody@test.com",
+                "password": "password"
+            })
+        
+        assert response.status_code == 401
+        assert hasher.call_count == 0
+    
     def test_get_current_user(self, client, admin_token):
         headers = {"Authorization": f"Bearer {admin_token}"}
         response = client.get("/auth/me", headers=headers)
@@ -209,6 +282,20 @@ class TestAuthenticationEndpoints:
         assert data["email"] == "admin@test.com"
         assert data["role"] == "admin"
     
+    def test_deactivated_user_rejected_despite_cache(self, client, admin_token, viewer_user, viewer_token):
+        viewer_headers = {"Authorization": f"Bearer {viewer_token}"}
+        assert client.get("/auth/me", headers=viewer_headers).status_code == 200
+        
+        response = client.put(
+            f"/auth/users/{viewer_user.id}/deactivate",
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 200
+        
+        response = client.get("/auth/me", headers=viewer_headers)
+        assert response.status_code == 401
+        assert "inactive" in response.json()["detail"]
+    
     def test_get_current_user_invalid_token(self, client):
         headers = {"Authorization": "Bearer invalid-token"}
         response = client.get("/auth/me", headers=headers)
@@ -272,6 +359,36 @@ class TestDashboardAccess:
         response = client.get("/dashboard", headers=headers)
         assert response.status_code == 200
     
+    def test_dashboard_data_aggregates_monthly_analytics(self, client, db, viewer_token):
+        for data in ({"amount": 10.0}, {"amount": 5.5, "category": "Rent"}, None):
+            db.add(LedgerEntry(actor="Human:test", action="t", data=data, prev_hash="GENESIS", hash="h"))
+        db.commit()
+        
+        headers = {"Authorization": f"Bearer {viewer_token}"}
+        analytics = client.get("/dashboard/data", headers=headers).json()["analytics"]
+        assert analytics["monthly_transaction_count"] == 3
+        assert analytics["monthly_volume"] == 15.5
+        assert analytics["transaction_categories"] == {"Other": 1, "Rent": 1}
+    
+    def test_dashboard_volume_sums_numbers_and_numeric_strings(self, client, db, viewer_token):
+        for amount in (7.25, 3, "100", " 12.5 ", "-1e1", "1,000", "12abc", "", None, True):
+            db.add(LedgerEntry(actor="Human:test", action="t", data={"amount": amount}, prev_hash="GENESIS", hash="h"))
+        db.commit()
+        
+        headers = {"Authorization": f"Bearer {viewer_token}"}
+        analytics = client.get("/dashboard/data", headers=headers).json()["analytics"]
+        assert analytics["monthly_transaction_count"] == 10
+        assert analytics["monthly_volume"] == 112.75
+    
+    def test_dashboard_keeps_null_category_apart_from_missing(self, client, db, viewer_token):
+        for data in ({"category": None}, {"amount": 1.0}, {"category": "Rent"}, {"category": "Other"}):
+            db.add(LedgerEntry(actor="Human:test", action="t", data=data, prev_hash="GENESIS", hash="h"))
+        db.commit()
+        
+        headers = {"Authorization": f"Bearer {viewer_token}"}
+        analytics = client.get("/dashboard/data", headers=headers).json()["analytics"]
+        assert analytics["transaction_categories"] == {"None": 1, "Other": 2, "Rent": 1}
+    
     def test_agent_status_requires_viewer(self, client, viewer_token):
         headers = {"Authorization": f"Bearer {viewer_token}"}
         response = client.get("/dashboard/agent-status", headers=headers)
@@ -290,6 +407,12 @@ class TestDashboardAccess:
 class TestRoleBasedAccess:
     """Test role-based access control for different endpoints"""
     
+    @pytest.fixture(autouse=True)
+    def invoice_storage(self, tmp_path, monkeypatch):
+        """Keep uploaded invoices out of the working tree"""
+        monkeypatch.setattr("cmp.routers.dashboard.INVOICE_STORAGE_DIR", tmp_path)
+        return tmp_path
+    
     def test_orchestrator_can_upload_invoice(self, client, orchestrator_token):
         headers = {"Authorization": f"Bearer {orchestrator_token}"}
         
@@ -306,6 +429,56 @@ class TestRoleBasedAccess:
         assert response.status_code != 401
         assert response.status_code != 403
     
+    def test_upload_is_stored_by_content_hash(self, client, orchestrator_token, invoice_storage):
+        import hashlib
+        import os
+        from pathlib import Path
+
+        headers = {"Authorization": f"Bearer {orchestrator_token}"}
+        content = b"content addressed invoice"
+        files = {"file": ("../../escape.png", content, "image/png")}
+        response = client.post("/dashboard/upload-invoice", headers=headers, files=files)
+
+        stored = invoice_storage / f"{hashlib.sha256(content).hexdigest()}.png"
+        assert response.status_code == 200
+        assert response.json()["filename"] == "../../escape.png"
+        assert stored.read_bytes() == content
+        assert list(invoice_storage.iterdir()) == [stored]
+        assert not Path("escape.png").exists()
+
+        # Same permissions a plain open() would have given the file
+        umask = os.umask(0)
+        os.umask(umask)
+        assert stored.stat().st_mode & 0o777 == 0o666 & ~umask
+
+        # The audit entry is written by a background task after the response
+        db = SessionLocal()
+        try:
+            entry = db.scalar(select(LedgerEntry).order_by(LedgerEntry.id.desc()).limit(1))
+        finally:
+            db.close()
+        assert entry.action == "invoice_uploaded"
+        assert entry.data["sha256"] == stored.stem
+    
+    def test_concurrent_realworld_entries_keep_one_chain(self, client, db, orchestrator_token):
+        from concurrent.futures import ThreadPoolExecutor
+
+        headers = {"Authorization": f"Bearer {orchestrator_token}"}
+
+        def post(i):
+            return client.post("/dashboard/realworld", headers=headers,
+                               data={"description": f"event {i}", "amount": i}).status_code
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            assert set(pool.map(post, range(40))) == {200}
+
+        chain = db.execute(
+            select(LedgerEntry.prev_hash, LedgerEntry.hash).order_by(LedgerEntry.id)
+        ).all()
+        assert len(chain) == 40
+        for prev, entry in zip(chain, chain[1:]):
+            assert entry.prev_hash == prev.hash
+    
     def test_viewer_cannot_upload_invoice(self, client, viewer_token):
         headers = {"Authorization": f"Bearer {viewer_token}"}
         
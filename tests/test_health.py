@@ -7,3 +7,14 @@ def test_healthz():
     resp = client.get("/healthz")
     assert resp.status_code == 200
     assert resp.json() == {"status": "ok"}
+
+
+def test_login_page_revalidates_with_etag():
+    client = TestClient(app)
+    first = client.get("/login")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    again = client.get("/login", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
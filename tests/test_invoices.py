@@ -0,0 +1,56 @@
+import pytest
+from datetime import date, timedelta
+
+from cmp.integrations.invoices import EmiratesNBDConnector, ENBD_TRANSACTION_PAGE_LIMIT
+
+
+def _fake_bank(transactions):
+    """Stand-in for the transactions endpoint: filters by date and caps at the page limit"""
+    calls = []
+
+    async def request(method, endpoint, data=None, params=None):
+        calls.append((params["from_date"], params["to_date"]))
+        matching = [
+            txn for txn in transactions
+            if params["from_date"] <= txn["date"] <= params["to_date"]
+        ]
+        return {"transactions": matching[:params["limit"]]}
+
+    return request, calls
+
+
+@pytest.mark.asyncio
+async def test_fetch_transactions_range_splits_full_windows(monkeypatch):
+    """A window that fills a page is refetched in halves so nothing is dropped"""
+    start = date(2025, 1, 1)
+    # 40 a day over one 7-day window: 280 transactions, well over one page
+    transactions = [
+        {"transaction_id": f"T{day}-{n}", "date": (start + timedelta(days=day)).isoformat()}
+        for day in range(7) for n in range(40)
+    ]
+    connector = EmiratesNBDConnector(api_key="key", client_id="client", account_number="123")
+    request, calls = _fake_bank(transactions)
+    monkeypatch.setattr(connector, "_make_emirates_nbd_request", request)
+
+    fetched = await connector.fetch_transactions_range(start, start + timedelta(days=6), window_days=7)
+
+    assert [txn["transaction_id"] for txn in fetched] == [txn["transaction_id"] for txn in transactions]
+    assert len(calls) > 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_transactions_range_keeps_a_full_single_day(monkeypatch):
+    """A single day over the page limit can't be split; its page is kept as is"""
+    day = date(2025, 1, 1)
+    transactions = [
+        {"transaction_id": f"T{n}", "date": day.isoformat()}
+        for n in range(ENBD_TRANSACTION_PAGE_LIMIT + 20)
+    ]
+    connector = EmiratesNBDConnector(api_key="key", client_id="client", account_number="123")
+    request, calls = _fake_bank(transactions)
+    monkeypatch.setattr(connector, "_make_emirates_nbd_request", request)
+
+    fetched = await connector.fetch_transactions_range(day, day)
+
+    assert len(fetched) == ENBD_TRANSACTION_PAGE_LIMIT
+    assert calls == [(day.isoformat(), day.isoformat())]
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
-from cmp.db import init_db, SessionLocal
-from cmp.models import append_ledger_entry, LedgerEntry
+import json
+
+import pytest
+from sqlalchemy import func, inspect, select
+
+from cmp.config import settings
+from cmp.db import engine, init_db, SessionLocal
+from cmp.models import append_ledger_entry, LedgerBusyError, LedgerEntry
 
 
 def setup_module(module):
@@ -25,3 +31,234 @@ def test_ledger_hash_chain():
 
     finally:
         s.close()
+
+
+def test_ledger_tail_survives_rollback():
+    s = SessionLocal()
+    try:
+        e1 = append_ledger_entry(s, actor="AI:Accountant", action="kept", data=None)
+        s.commit()
+
+        append_ledger_entry(s, actor="AI:Accountant", action="discarded", data=None)
+        s.rollback()
+
+        # The rolled-back entry must not become the chain's tail
+        e2 = append_ledger_entry(s, actor="AI:Accountant", action="next", data=None)
+        s.commit()
+        assert e2.prev_hash == e1.hash
+    finally:
+        s.close()
+
+
+def test_append_ledger_entries_batch_chains():
+    from cmp.models import append_ledger_entries, compute_ledger_hash
+
+    s = SessionLocal()
+    try:
+        head = append_ledger_entry(s, actor="AI:Accountant", action="head", data=None)
+        batch = append_ledger_entries(s, [
+            ("AI:Accountant", "line", {"n": 1}),
+            ("AI:Accountant", "line", {"n": 2}),
+        ])
+        tail = append_ledger_entry(s, actor="AI:Accountant", action="tail", data=None)
+        s.commit()
+
+        assert batch[0].prev_hash == head.hash
+        assert batch[1].prev_hash == batch[0].hash
+        assert tail.prev_hash == batch[1].hash
+        assert batch[0].id < batch[1].id
+        for e in batch:
+            assert e.hash == compute_ledger_hash(e.prev_hash, e.timestamp, e.actor, e.action, e.data)
+    finally:
+        s.close()
+
+
+def test_reloaded_entry_hash_verifies():
+    from cmp.models import compute_ledger_hash
+
+    s = SessionLocal()
+    try:
+        entry_id = append_ledger_entry(s, actor="AI:Accountant", action="reload", data={"v": 3}).id
+        s.commit()
+    finally:
+        s.close()
+
+    s = SessionLocal()
+    try:
+        e = s.get(LedgerEntry, entry_id)
+        assert e.hash == compute_ledger_hash(e.prev_hash, e.timestamp, e.actor, e.action, e.data)
+    finally:
+        s.close()
+
+
+def test_json_column_round_trips_through_codec():
+    from cmp.db import _json_deserializer, _json_serializer
+
+    for value in ({"a": [1, 2.5, "é"]}, {"n": None}, {"x": float("nan")}, {1: 2**70}, {"a": [None, -2**63 - 1]}):
+        # Same value back as the stdlib round trip (compared as text for NaN)
+        restored = _json_deserializer(_json_serializer(value))
+        assert json.dumps(restored) == json.dumps(json.loads(json.dumps(value)))
+
+
+def test_json_codec_keeps_orjson_for_nulls_and_long_digit_strings():
+    from cmp.db import ORJSON_AVAILABLE, _json_deserializer, _json_serializer
+
+    value = {"vendor": None, "note": "null", "reference": "12345678901234567890123"}
+    raw = _json_serializer(value)
+    if ORJSON_AVAILABLE:
+        assert raw == '{"vendor":null,"note":"null","reference":"12345678901234567890123"}'
+    assert _json_deserializer(raw) == value
+
+
+def test_ledger_version_bumps_only_on_commit():
+    from cmp.models import ledger_version
+
+    s = SessionLocal()
+    try:
+        before = ledger_version()
+        append_ledger_entry(s, actor="AI:Accountant", action="discarded", data=None)
+        s.rollback()
+        assert ledger_version() == before
+
+        append_ledger_entry(s, actor="AI:Accountant", action="kept", data=None)
+        s.commit()
+        assert ledger_version() == before + 1
+    finally:
+        s.close()
+
+
+def test_concurrent_appends_keep_one_chain():
+    import threading
+
+    def writer(n):
+        s = SessionLocal()
+        try:
+            for i in range(20):
+                append_ledger_entry(s, actor="AI:Accountant", action=f"w{n}-{i}", data={"i": i})
+                s.commit()
+        finally:
+            s.close()
+
+    s = SessionLocal()
+    try:
+        start = s.scalar(select(func.max(LedgerEntry.id))) or 0
+    finally:
+        s.close()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    s = SessionLocal()
+    try:
+        chain = s.execute(
+            select(LedgerEntry.prev_hash, LedgerEntry.hash)
+            .where(LedgerEntry.id >= start)
+            .order_by(LedgerEntry.id)
+        ).all()
+    finally:
+        s.close()
+
+    assert len(chain) == 8 * 20 + (1 if start else 0)
+    for prev, entry in zip(chain, chain[1:]):
+        assert entry.prev_hash == prev.hash
+
+
+def test_background_appends_chain_with_request_appends():
+    import threading
+    from cmp.routers.dashboard import _append_ledger_entry_after_response
+
+    def request_path(n):
+        s = SessionLocal()
+        try:
+            for i in range(10):
+                append_ledger_entry(s, actor="Human:test", action=f"req{n}-{i}", data=None)
+                s.commit()
+        finally:
+            s.close()
+
+    def background(n):
+        for i in range(10):
+            _append_ledger_entry_after_response(actor="Human:test", action=f"bg{n}-{i}", data={"i": i})
+
+    s = SessionLocal()
+    try:
+        start = s.scalar(select(func.max(LedgerEntry.id))) or 0
+    finally:
+        s.close()
+
+    threads = [threading.Thread(target=fn, args=(n,)) for n in range(4) for fn in (request_path, background)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    s = SessionLocal()
+    try:
+        chain = s.execute(
+            select(LedgerEntry.prev_hash, LedgerEntry.hash)
+            .where(LedgerEntry.id >= start)
+            .order_by(LedgerEntry.id)
+        ).all()
+    finally:
+        s.close()
+
+    assert len(chain) == 8 * 10 + (1 if start else 0)
+    for prev, entry in zip(chain, chain[1:]):
+        assert entry.prev_hash == prev.hash
+
+
+def test_second_session_on_same_thread_fails_instead_of_deadlocking(monkeypatch):
+    monkeypatch.setattr(settings, "ledger_writer_timeout", 0.2)
+    first, second = SessionLocal(), SessionLocal()
+    try:
+        e1 = append_ledger_entry(first, actor="AI:Accountant", action="first", data=None)
+        with pytest.raises(LedgerBusyError):
+            append_ledger_entry(second, actor="AI:Accountant", action="second", data=None)
+
+        # Once the first transaction ends the second session can append
+        first.commit()
+        e2 = append_ledger_entry(second, actor="AI:Accountant", action="second", data=None)
+        second.commit()
+        assert e2.prev_hash == e1.hash
+    finally:
+        first.close()
+        second.close()
+
+
+def test_append_on_event_loop_does_not_wait_for_writer(monkeypatch):
+    import asyncio
+    import time
+
+    monkeypatch.setattr(settings, "ledger_writer_timeout", 30)
+    holder = SessionLocal()
+    try:
+        append_ledger_entry(holder, actor="AI:Accountant", action="holder", data=None)
+
+        async def append_from_coroutine():
+            s = SessionLocal()
+            try:
+                append_ledger_entry(s, actor="AI:Accountant", action="async", data=None)
+            finally:
+                s.close()
+
+        started = time.monotonic()
+        with pytest.raises(LedgerBusyError):
+            asyncio.run(append_from_coroutine())
+        assert time.monotonic() - started < 5
+    finally:
+        holder.close()
+
+
+def test_init_db_adds_missing_ledger_index():
+    # A database created before ix_ledger_recent existed
+    index = next(ix for ix in LedgerEntry.__table__.indexes if ix.name == "ix_ledger_recent")
+    index.drop(bind=engine)
+    assert "ix_ledger_recent" not in {ix["name"] for ix in inspect(engine).get_indexes("ledger_entries")}
+
+    init_db()
+    init_db()  # idempotent
+
+    assert "ix_ledger_recent" in {ix["name"] for ix in inspect(engine).get_indexes("ledger_entries")}
@@ -0,0 +1,22 @@
+import logging
+import logging.handlers
+
+from cmp.logging_config import get_logger, setup_logging, shutdown_logging
+
+
+def test_setup_logging_feeds_listener_when_root_already_has_handlers(tmp_path, monkeypatch):
+    """A handler installed first (by pytest, uvicorn, ...) must not stop records reaching the log files"""
+    monkeypatch.chdir(tmp_path)
+    root = logging.getLogger()
+    existing = logging.NullHandler()
+    root.addHandler(existing)
+    try:
+        setup_logging()
+        get_logger("agents.accountant").info("queued record")
+        shutdown_logging()
+    finally:
+        root.removeHandler(existing)
+
+    assert "queued record" in (tmp_path / "logs" / "cmp.log").read_text()
+    assert "queued record" in (tmp_path / "logs" / "agent_accountant.log").read_text()
+    assert not any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers)
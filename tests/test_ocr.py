@@ -73,3 +73,44 @@ def test_text_parsing_methods(ocr_processor):
     text_no_currency = "Total: 100.00"
     currency = ocr_processor._extract_currency(text_no_currency)
     assert currency == "AED"
+
+
+@pytest.mark.asyncio
+async def test_extract_invoice_data_once_coalesces_by_content_key(ocr_processor):
+    """Concurrent and repeat OCR of the same content runs Tesseract once"""
+    import asyncio
+    from unittest.mock import AsyncMock, patch
+
+    result = {"raw_text": "INV-1", "invoice_number": "INV-1"}
+    with patch.object(ocr_processor, "extract_invoice_data", AsyncMock(return_value=result)) as extract:
+        path = Path("invoice.png")
+        first, second = await asyncio.gather(
+            ocr_processor.extract_invoice_data_once(path, "abc"),
+            ocr_processor.extract_invoice_data_once(path, "abc"),
+        )
+        third = await ocr_processor.extract_invoice_data_once(path, "abc")
+
+    assert first == second == third == result
+    assert extract.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_extract_invoice_data_once_gives_each_caller_a_copy(ocr_processor):
+    """A caller editing its result must not change what later callers get"""
+    import asyncio
+    from unittest.mock import AsyncMock, patch
+
+    result = {"raw_text": "INV-1", "amount": 100.0, "line_items": [{"description": "Item"}]}
+    with patch.object(ocr_processor, "extract_invoice_data", AsyncMock(return_value=result)):
+        path = Path("invoice.png")
+        first, second = await asyncio.gather(
+            ocr_processor.extract_invoice_data_once(path, "abc"),
+            ocr_processor.extract_invoice_data_once(path, "abc"),
+        )
+        first["amount"] = 1.0
+        first["line_items"].append({"description": "Extra"})
+        third = await ocr_processor.extract_invoice_data_once(path, "abc")
+        third["line_items"][0]["description"] = "Changed"
+        fourth = await ocr_processor.extract_invoice_data_once(path, "abc")
+
+    assert second == fourth == {"raw_text": "INV-1", "amount": 100.0, "line_items": [{"description": "Item"}]}